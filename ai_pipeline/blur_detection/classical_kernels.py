@@ -0,0 +1,75 @@
+"""
+Numba kernels for classical blur metrics
+Fused Laplacian variance + Sobel magnitude in a single pass over the image
+"""
+
+import numpy as np
+from typing import Tuple
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _lap_var_sobel_mean(gray: np.ndarray) -> Tuple[float, float]:
+        rows, cols = gray.shape
+        sum_l = 0.0
+        sum_l2 = 0.0
+        sum_mag = 0.0
+
+        for i in prange(rows):
+            # BORDER_REFLECT_101, matching OpenCV's default border handling
+            up = i - 1 if i > 0 else 1
+            down = i + 1 if i < rows - 1 else rows - 2
+
+            for j in range(cols):
+                left = j - 1 if j > 0 else 1
+                right = j + 1 if j < cols - 1 else cols - 2
+
+                tl = np.float32(gray[up, left])
+                tc = np.float32(gray[up, j])
+                tr = np.float32(gray[up, right])
+                ml = np.float32(gray[i, left])
+                mc = np.float32(gray[i, j])
+                mr = np.float32(gray[i, right])
+                bl = np.float32(gray[down, left])
+                bc = np.float32(gray[down, j])
+                br = np.float32(gray[down, right])
+
+                # 3x3 Laplacian (same aperture as cv2.Laplacian ksize=1)
+                lap = tc + ml + mr + bc - 4.0 * mc
+
+                # 3x3 Sobel
+                gx = (tr + 2.0 * mr + br) - (tl + 2.0 * ml + bl)
+                gy = (bl + 2.0 * bc + br) - (tl + 2.0 * tc + tr)
+
+                sum_l += lap
+                sum_l2 += lap * lap
+                sum_mag += np.sqrt(gx * gx + gy * gy)
+
+        n = rows * cols
+        mean_l = sum_l / n
+        variance = sum_l2 / n - mean_l * mean_l
+        return variance, sum_mag / n
+
+
+def lap_var_sobel_mean(gray: np.ndarray) -> Tuple[float, float]:
+    """
+    Compute Laplacian variance and mean Sobel magnitude in one pass
+
+    Args:
+        gray: Grayscale uint8 image (at least 2x2)
+
+    Returns:
+        Tuple of (laplacian_variance, sobel_gradient)
+    """
+    if not NUMBA_AVAILABLE:
+        raise RuntimeError("Numba is not installed")
+
+    variance, avg_magnitude = _lap_var_sobel_mean(np.ascontiguousarray(gray))
+    return float(variance), float(avg_magnitude)
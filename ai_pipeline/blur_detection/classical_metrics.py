@@ -3,14 +3,155 @@ Classical Blur Detection Metrics
 Laplacian variance, Sobel gradient, FFT-based methods
 """
 
+import functools
+import threading
 import cv2
 import numpy as np
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 import sys  # Add this for command-line testing
 
+from ai_pipeline.blur_detection.classical_kernels import (
+    NUMBA_AVAILABLE,
+    lap_var_sobel_mean,
+)
+
+class MetricWorkspace:
+    """Preallocated per-frame buffers for one grayscale frame shape"""
+    
+    def __init__(self, shape: Tuple[int, int]):
+        rows, cols = shape
+        self.shape = shape
+        
+        self.laplacian = np.empty(shape, dtype=np.int16)
+        self.grad_x = np.empty(shape, dtype=np.int16)
+        self.grad_y = np.empty(shape, dtype=np.int16)
+        self.grad_x_f = np.empty(shape, dtype=np.float32)
+        self.grad_y_f = np.empty(shape, dtype=np.float32)
+        self.magnitude = np.empty(shape, dtype=np.float32)
+        
+        self.gray_f = np.empty(shape, dtype=np.float32)
+        self.dft = np.empty((rows, cols, 2), dtype=np.float32)
+        self.spectrum = np.empty(shape, dtype=np.float32)
+        
+        # Low-frequency disc moved to the unshifted spectrum layout, so the
+        # per-frame fftshift copy is not needed
+        self.fft_mask = np.fft.ifftshift(BlurDetector._center_mask(rows, cols))
+
+
 class BlurDetector:
     """Classical blur detection using multiple metrics"""
     
+    # Workspaces are per thread so concurrent callers never share buffers
+    _local = threading.local()
+    
+    @staticmethod
+    def configure(shape: Tuple[int, int]) -> MetricWorkspace:
+        """
+        Specialize the metrics for a fixed frame size
+        
+        Preallocates all intermediate buffers for the calling thread; later
+        frames of the same size reuse them. Called lazily on shape change.
+        
+        Args:
+            shape: Grayscale frame shape (rows, cols)
+            
+        Returns:
+            Workspace for this thread
+        """
+        workspace = MetricWorkspace(tuple(shape))
+        BlurDetector._local.workspace = workspace
+        return workspace
+    
+    @staticmethod
+    def _workspace(gray: np.ndarray):
+        """Workspace for a uint8 frame, or None to use the allocating path"""
+        if gray.dtype != np.uint8 or gray.ndim != 2:
+            return None
+        workspace = getattr(BlurDetector._local, "workspace", None)
+        if workspace is None or workspace.shape != gray.shape:
+            workspace = BlurDetector.configure(gray.shape)
+        return workspace
+    
+    @staticmethod
+    def to_gray(image: np.ndarray) -> np.ndarray:
+        """
+        Convert image to grayscale (no-op for single-channel input)
+        
+        Args:
+            image: Input image (grayscale or BGR)
+            
+        Returns:
+            Grayscale image
+        """
+        if len(image.shape) == 3:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return image
+    
+    @staticmethod
+    def downsample(gray: np.ndarray, max_side: Optional[int]) -> np.ndarray:
+        """
+        Shrink a frame so its longer side is at most max_side
+        
+        Blur is judged relative to scene structure, not pixel pitch, so the
+        metrics do not need full 4K/1080p resolution. Scores shift with the
+        output resolution, so thresholds must be calibrated for max_side.
+        
+        Args:
+            gray: Grayscale image
+            max_side: Maximum side length (None to keep full resolution)
+            
+        Returns:
+            Downsampled image (or the input if already small enough)
+        """
+        rows, cols = gray.shape[:2]
+        if max_side is None or max(rows, cols) <= max_side:
+            return gray
+        
+        rows_out, cols_out = BlurDetector.downsample_shape((rows, cols), max_side)
+        return cv2.resize(gray, (cols_out, rows_out), interpolation=cv2.INTER_AREA)
+    
+    @staticmethod
+    def downsample_shape(shape: Tuple[int, int], max_side: int) -> Tuple[int, int]:
+        """
+        Output shape of downsample for a frame larger than max_side
+        
+        Args:
+            shape: Input shape (rows, cols)
+            max_side: Maximum side length
+            
+        Returns:
+            Downsampled shape (rows, cols)
+        """
+        rows, cols = shape
+        scale = max_side / max(rows, cols)
+        return max(1, round(rows * scale)), max(1, round(cols * scale))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def area_weights(n_in: int, n_out: int) -> np.ndarray:
+        """
+        INTER_AREA resampling matrix along one axis, cached per size
+        
+        Row i holds the fraction of each source pixel covered by output
+        pixel i, so W @ x reproduces cv2.INTER_AREA downscaling (before
+        rounding) for any, not only integer, scale factor.
+        
+        Args:
+            n_in: Source length
+            n_out: Output length (<= n_in)
+            
+        Returns:
+            Read-only float32 matrix [n_out, n_in] with rows summing to 1
+        """
+        scale = n_in / n_out
+        edges = np.arange(n_out + 1, dtype=np.float64) * scale
+        start, end = edges[:-1, None], edges[1:, None]
+        src = np.arange(n_in, dtype=np.float64)[None, :]
+        overlap = np.clip(np.minimum(end, src + 1) - np.maximum(start, src), 0.0, None)
+        weights = (overlap / scale).astype(np.float32)
+        weights.setflags(write=False)
+        return weights
+    
     @staticmethod
     def laplacian_variance(image: np.ndarray) -> float:
         """
@@ -23,14 +164,19 @@ class BlurDetector:
         Returns:
             Variance of Laplacian (higher = sharper)
         """
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
+        gray = BlurDetector.to_gray(image)
+        workspace = BlurDetector._workspace(gray)
         
-        laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-        variance = laplacian.var()
-        return float(variance)
+        # The default 3x3 aperture peaks at 4*255 for uint8 input, so int16
+        # holds it exactly at a quarter of the FP64 bandwidth; meanStdDev
+        # avoids materializing a second array for the variance
+        if workspace is not None:
+            laplacian = cv2.Laplacian(gray, cv2.CV_16S, dst=workspace.laplacian)
+        else:
+            laplacian = cv2.Laplacian(gray, cv2.CV_16S)
+        _, std = cv2.meanStdDev(laplacian)
+        variance = float(std[0, 0]) ** 2
+        return variance
     
     @staticmethod
     def sobel_gradient(image: np.ndarray) -> float:
@@ -43,21 +189,51 @@ class BlurDetector:
         Returns:
             Average gradient magnitude
         """
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
+        gray = BlurDetector.to_gray(image)
+        workspace = BlurDetector._workspace(gray)
         
         # Compute gradients in x and y directions
-        grad_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        grad_y = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        
-        # Compute magnitude
-        magnitude = np.sqrt(grad_x**2 + grad_y**2)
-        avg_magnitude = np.mean(magnitude)
+        if workspace is not None:
+            # One SIMD pass producing int16 Gx and Gy (3x3 Sobel)
+            cv2.spatialGradient(
+                gray, workspace.grad_x, workspace.grad_y, ksize=3
+            )
+            np.copyto(workspace.grad_x_f, workspace.grad_x)
+            np.copyto(workspace.grad_y_f, workspace.grad_y)
+            
+            # Compute magnitude (exact L2, so thresholds are unchanged)
+            magnitude = cv2.magnitude(
+                workspace.grad_x_f, workspace.grad_y_f, workspace.magnitude
+            )
+        else:
+            grad_x = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+            grad_y = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+            magnitude = cv2.magnitude(grad_x, grad_y)
+        avg_magnitude = cv2.mean(magnitude)[0]
         
         return float(avg_magnitude)
     
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _center_mask(rows: int, cols: int) -> np.ndarray:
+        """
+        Low-frequency disc mask for a centred spectrum, cached per shape
+        
+        Args:
+            rows: Spectrum height
+            cols: Spectrum width
+            
+        Returns:
+            Read-only boolean mask (True inside the low-frequency disc)
+        """
+        crow, ccol = rows // 2, cols // 2
+        center_radius = min(rows, cols) // 4
+        
+        y, x = np.ogrid[:rows, :cols]
+        mask = ((x - ccol)**2 + (y - crow)**2) <= center_radius**2
+        mask.setflags(write=False)
+        return mask
+    
     @staticmethod
     def fft_frequency_analysis(image: np.ndarray) -> float:
         """
@@ -70,28 +246,28 @@ class BlurDetector:
         Returns:
             High frequency ratio (0-1, higher = sharper)
         """
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
-        
-        # Compute FFT
-        f_transform = np.fft.fft2(gray)
-        f_shift = np.fft.fftshift(f_transform)
-        magnitude_spectrum = np.abs(f_shift)
-        
-        # Calculate center region (low frequencies)
-        rows, cols = gray.shape
-        crow, ccol = rows // 2, cols // 2
-        center_radius = min(rows, cols) // 4
+        gray = BlurDetector.to_gray(image)
+        workspace = BlurDetector._workspace(gray)
         
-        # Create masks for low and high frequencies
-        y, x = np.ogrid[:rows, :cols]
-        center_mask = ((x - ccol)**2 + (y - crow)**2) <= center_radius**2
+        # Compute FFT (OpenCV's SIMD DFT in FP32, two-channel complex output)
+        if workspace is not None:
+            np.copyto(workspace.gray_f, gray)
+            cv2.dft(workspace.gray_f, workspace.dft, flags=cv2.DFT_COMPLEX_OUTPUT)
+            magnitude_spectrum = np.abs(
+                workspace.dft.view(np.complex64)[..., 0], out=workspace.spectrum
+            )
+            center_mask = workspace.fft_mask
+        else:
+            dft = cv2.dft(gray.astype(np.float32), flags=cv2.DFT_COMPLEX_OUTPUT)
+            dft_shift = np.fft.fftshift(dft, axes=(0, 1))
+            magnitude_spectrum = cv2.magnitude(dft_shift[..., 0], dft_shift[..., 1])
+            
+            # Low-frequency mask is constant for a given frame size
+            center_mask = BlurDetector._center_mask(*gray.shape)
         
         # Calculate energy in high frequencies
-        total_energy = np.sum(magnitude_spectrum)
-        center_energy = np.sum(magnitude_spectrum[center_mask])
+        total_energy = cv2.sumElems(magnitude_spectrum)[0]
+        center_energy = float(magnitude_spectrum.sum(where=center_mask, dtype=np.float64))
         high_freq_ratio = 1.0 - (center_energy / (total_energy + 1e-8))
         
         return float(high_freq_ratio)
@@ -100,7 +276,9 @@ class BlurDetector:
     def detect_blur(
         image: np.ndarray,
         threshold: float = 100.0,
-        method: str = "laplacian"
+        method: str = "laplacian",
+        strict: bool = False,
+        max_side: Optional[int] = None
     ) -> Tuple[bool, float, Dict[str, float]]:
         """
         Detect if image is blurred
@@ -109,38 +287,129 @@ class BlurDetector:
             image: Input image
             threshold: Blur threshold (for Laplacian method)
             method: Detection method ("laplacian", "sobel", "fft", "combined")
+            strict: For "combined", always compute all three metrics instead
+                of returning early when the Laplacian score is decisive
+            max_side: Downsample (INTER_AREA) so the longer side is at most
+                this many pixels before computing metrics; None (default)
+                keeps full resolution. Thresholds are calibrated at full
+                resolution, so recalibrate them when enabling this
             
         Returns:
             Tuple of (is_blurred, score, all_metrics)
         """
+        if method not in ("laplacian", "sobel", "fft", "combined"):
+            raise ValueError(f"Unknown method: {method}")
+        
         detector = BlurDetector()
         
-        # Compute all metrics
-        lap_var = detector.laplacian_variance(image)
-        sobel_grad = detector.sobel_gradient(image)
-        fft_ratio = detector.fft_frequency_analysis(image)
+        # Convert once and share the grayscale frame across all metrics
+        gray = detector.to_gray(image)
+        gray = detector.downsample(gray, max_side)
+        
+        # Only compute the metrics the selected method needs
+        needs_sobel = method in ("sobel", "combined")
+        use_fused = (
+            NUMBA_AVAILABLE
+            and needs_sobel
+            and gray.dtype == np.uint8
+            and min(gray.shape) >= 2
+        )
+        
+        lap_var = None
+        if method == "combined" and not strict:
+            # Confidently sharp/blurred frames skip the Sobel and FFT passes
+            lap_var = detector.laplacian_variance(gray)
+            shortcut = detector.laplacian_shortcut(lap_var, threshold)
+            if shortcut is not None:
+                return shortcut
+        
+        if use_fused:
+            # Laplacian + Sobel stencils share one pass over the frame
+            fused_lap_var, sobel_grad = lap_var_sobel_mean(gray)
+            if lap_var is None:
+                lap_var = fused_lap_var
+        else:
+            if lap_var is None:
+                lap_var = detector.laplacian_variance(gray)
+            if needs_sobel:
+                sobel_grad = detector.sobel_gradient(gray)
+        
+        metrics = {"laplacian_variance": lap_var}
+        if needs_sobel:
+            metrics["sobel_gradient"] = sobel_grad
+        
+        if method in ("fft", "combined"):
+            fft_ratio = detector.fft_frequency_analysis(gray)
+            metrics["fft_high_freq_ratio"] = fft_ratio
+        
+        is_blurred, score = detector.score_metrics(metrics, threshold, method)
+        return is_blurred, score, metrics
+    
+    @staticmethod
+    def laplacian_shortcut(
+        lap_var: float,
+        threshold: float = 100.0
+    ) -> Optional[Tuple[bool, float, Dict[str, Optional[float]]]]:
+        """
+        Decide a "combined" frame from the Laplacian alone when it is decisive
+        
+        The score is the Laplacian term of the combined score; the skipped
+        Sobel and FFT metrics are reported as None.
+        
+        Args:
+            lap_var: Laplacian variance of the frame
+            threshold: Blur threshold (for Laplacian method)
+            
+        Returns:
+            Tuple of (is_blurred, score, all_metrics), or None if the Sobel
+            and FFT metrics are needed
+        """
+        if 0.3 * threshold <= lap_var <= 3.0 * threshold:
+            return None
         
         metrics = {
             "laplacian_variance": lap_var,
-            "sobel_gradient": sobel_grad,
-            "fft_high_freq_ratio": fft_ratio
+            "sobel_gradient": None,
+            "fft_high_freq_ratio": None
         }
+        score = min(lap_var / threshold, 1.0) * 100
+        return lap_var < 0.3 * threshold, score, metrics
+    
+    @staticmethod
+    def score_metrics(
+        metrics: Dict[str, float],
+        threshold: float = 100.0,
+        method: str = "laplacian"
+    ) -> Tuple[bool, float]:
+        """
+        Turn precomputed metrics into a blur decision
         
+        Args:
+            metrics: Metric values keyed as returned by detect_blur
+            threshold: Blur threshold (for Laplacian method)
+            method: Detection method ("laplacian", "sobel", "fft", "combined")
+            
+        Returns:
+            Tuple of (is_blurred, score)
+        """
         # Determine blur based on method
         if method == "laplacian":
+            lap_var = metrics["laplacian_variance"]
             is_blurred = lap_var < threshold
             score = lap_var
         elif method == "sobel":
+            sobel_grad = metrics["sobel_gradient"]
             is_blurred = sobel_grad < (threshold / 10)
             score = sobel_grad
         elif method == "fft":
+            fft_ratio = metrics["fft_high_freq_ratio"]
             is_blurred = fft_ratio < 0.3
             score = fft_ratio * 100
         elif method == "combined":
             # Normalized combined score
-            lap_norm = min(lap_var / threshold, 1.0)
-            sobel_norm = min(sobel_grad / (threshold / 10), 1.0)
-            fft_norm = fft_ratio
+            lap_norm = min(metrics["laplacian_variance"] / threshold, 1.0)
+            sobel_norm = min(metrics["sobel_gradient"] / (threshold / 10), 1.0)
+            fft_norm = metrics["fft_high_freq_ratio"]
             
             combined_score = (lap_norm + sobel_norm + fft_norm) / 3.0 * 100
             is_blurred = combined_score < 50.0
@@ -148,7 +417,7 @@ class BlurDetector:
         else:
             raise ValueError(f"Unknown method: {method}")
         
-        return is_blurred, score, metrics
+        return is_blurred, score
 
 
 # Test function
@@ -176,7 +445,8 @@ if __name__ == "__main__":
     is_blurred, score, metrics = BlurDetector.detect_blur(
         image,
         threshold=100.0,
-        method="combined"
+        method="combined",
+        strict=True
     )
     
     print(f"\nImage: {img_path}")
@@ -3,15 +3,21 @@ CNN-based blur detection classifier
 Lightweight model for real-time blur assessment
 """
 
+import copy
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from typing import Tuple
+from torch.nn.utils import fuse_conv_bn_eval
+from pathlib import Path
+from typing import Tuple, Union
 
 
 class BlurClassifierCNN(nn.Module):
     """Lightweight CNN for binary blur classification"""
     
+    # (conv, batchnorm) attribute pairs that can be folded for deployment
+    CONV_BN_PAIRS = (("conv1", "bn1"), ("conv2", "bn2"), ("conv3", "bn3"), ("conv4", "bn4"))
+    
     def __init__(self, input_size: int = 224, num_classes: int = 2):
         """
         Initialize blur classifier
@@ -105,18 +111,27 @@ class BlurClassifierCNN(nn.Module):
 class LightBlurClassifier(nn.Module):
     """Ultra-lightweight blur classifier for edge devices"""
     
+    CONV_BN_PAIRS = (
+        ("conv1", "bn1"),
+        ("dw_conv2", "dw_bn2"), ("pw_conv2", "bn2"),
+        ("dw_conv3", "dw_bn3"), ("pw_conv3", "bn3"),
+    )
+    
     def __init__(self):
         super(LightBlurClassifier, self).__init__()
         
         # Depthwise separable convolutions for efficiency
+        # (MobileNet blocks: dw -> BN -> ReLU -> pw -> BN -> ReLU)
         self.conv1 = nn.Conv2d(3, 32, 3, stride=2, padding=1)
         self.bn1 = nn.BatchNorm2d(32)
         
-        self.dw_conv2 = nn.Conv2d(32, 32, 3, stride=2, padding=1, groups=32)
+        self.dw_conv2 = nn.Conv2d(32, 32, 3, stride=2, padding=1, groups=32, bias=False)
+        self.dw_bn2 = nn.BatchNorm2d(32)
         self.pw_conv2 = nn.Conv2d(32, 64, 1)
         self.bn2 = nn.BatchNorm2d(64)
         
-        self.dw_conv3 = nn.Conv2d(64, 64, 3, stride=2, padding=1, groups=64)
+        self.dw_conv3 = nn.Conv2d(64, 64, 3, stride=2, padding=1, groups=64, bias=False)
+        self.dw_bn3 = nn.BatchNorm2d(64)
         self.pw_conv3 = nn.Conv2d(64, 128, 1)
         self.bn3 = nn.BatchNorm2d(128)
         
@@ -126,10 +141,10 @@ class LightBlurClassifier(nn.Module):
     def forward(self, x):
         x = F.relu(self.bn1(self.conv1(x)))
         
-        x = self.dw_conv2(x)
+        x = F.relu(self.dw_bn2(self.dw_conv2(x)))
         x = F.relu(self.bn2(self.pw_conv2(x)))
         
-        x = self.dw_conv3(x)
+        x = F.relu(self.dw_bn3(self.dw_conv3(x)))
         x = F.relu(self.bn3(self.pw_conv3(x)))
         
         x = self.global_pool(x)
@@ -160,6 +175,58 @@ def create_blur_classifier(model_type: str = "standard", pretrained: bool = Fals
     return model
 
 
+def fuse_conv_bn(model: nn.Module) -> nn.Module:
+    """
+    Fold BatchNorm layers into the preceding convolutions
+    
+    Args:
+        model: Blur classifier with a CONV_BN_PAIRS attribute
+        
+    Returns:
+        Fused copy of the model in eval mode (original is untouched)
+    """
+    fused = copy.deepcopy(model).eval()
+    for conv_name, bn_name in fused.CONV_BN_PAIRS:
+        conv = getattr(fused, conv_name)
+        bn = getattr(fused, bn_name)
+        setattr(fused, conv_name, fuse_conv_bn_eval(conv, bn))
+        setattr(fused, bn_name, nn.Identity())
+    return fused
+
+
+def export_onnx(
+    model: nn.Module,
+    path: Union[str, Path],
+    input_size: int = 224,
+    opset_version: int = 17
+) -> str:
+    """
+    Export blur classifier to ONNX for ONNX Runtime / TensorRT
+    
+    Args:
+        model: Trained blur classifier
+        path: Output .onnx file path
+        input_size: Square input resolution
+        opset_version: ONNX opset
+        
+    Returns:
+        Path of the written ONNX file
+    """
+    fused = fuse_conv_bn(model).cpu()
+    dummy_input = torch.randn(1, 3, input_size, input_size)
+    
+    torch.onnx.export(
+        fused,
+        dummy_input,
+        str(path),
+        opset_version=opset_version,
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "N"}, "logits": {0: "N"}}
+    )
+    return str(path)
+
+
 # Test function
 if __name__ == "__main__":
     # Test model creation and forward pass
@@ -2,10 +2,14 @@
 Blur detection inference - combines classical + CNN methods
 """
 
+import functools
+import os
 import cv2
 import numpy as np
 import torch
 import torch.nn.functional as F
+from torchvision.transforms.functional import rgb_to_grayscale
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Tuple, Optional
 from pathlib import Path
 import yaml
@@ -13,6 +17,22 @@ import yaml
 from ai_pipeline.blur_detection.classical_metrics import BlurDetector
 from ai_pipeline.blur_detection.cnn_model import create_blur_classifier
 
+try:
+    import onnxruntime as ort
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+
+# libyaml C parser when available
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config(config_path: str) -> dict:
+    """Parse a YAML config once per path (shared by all instances, treat as read-only)"""
+    with open(config_path, 'r') as f:
+        return yaml.load(f, Loader=YAML_LOADER)
+
 
 class BlurDetectionInference:
     """Combined blur detection using classical and CNN methods"""
@@ -21,32 +41,53 @@ class BlurDetectionInference:
         self,
         config_path: str = "ai_pipeline/configs/blur_detection.yaml",
         model_path: Optional[str] = None,
-        device: str = "cpu"
+        device: str = "cpu",
+        compile_model: bool = True
     ):
         """
         Initialize blur detection inference
         
         Args:
             config_path: Path to configuration file
-            model_path: Path to trained CNN model (optional)
+            model_path: Path to trained CNN model (optional, .pth or .onnx)
             device: Device to run model on ("cpu" or "cuda")
+            compile_model: Compile the PyTorch CNN with torch.compile
         """
         self.device = torch.device(device)
         
         # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        self.config = _load_config(str(config_path))
         
         # Initialize classical detector
         self.classical_detector = BlurDetector()
         
         # Initialize CNN model if path provided
         self.use_cnn = model_path is not None and Path(model_path).exists()
-        if self.use_cnn:
+        self.session = None
+        self.quantized = self.use_cnn and "_int8" in Path(model_path).name
+        if self.use_cnn and str(model_path).endswith(".onnx"):
+            if not ORT_AVAILABLE:
+                raise ImportError("onnxruntime is required to run .onnx blur models")
+            providers = [
+                p for p in ("CUDAExecutionProvider", "CPUExecutionProvider")
+                if p in ort.get_available_providers()
+            ]
+            self.model = None
+            self.session = ort.InferenceSession(model_path, providers=providers)
+            self._session_input = self.session.get_inputs()[0].name
+            print(f"✓ Loaded ONNX blur model from {model_path} ({providers[0]})")
+        elif self.quantized:
+            # INT8 TorchScript from quantize.py; quantized kernels are CPU-only
+            self.model = torch.jit.load(model_path, map_location="cpu")
+            self.model.eval()
+            print(f"✓ Loaded INT8 CNN model from {model_path}")
+        elif self.use_cnn:
             self.model = create_blur_classifier("standard")
             checkpoint = torch.load(model_path, map_location=self.device)
             self.model.load_state_dict(checkpoint['model_state_dict'])
             self.model.to(self.device)
+            if self.device.type == "cuda":
+                self.model.to(memory_format=torch.channels_last)
             self.model.eval()
             print(f"✓ Loaded CNN model from {model_path}")
         else:
@@ -55,6 +96,190 @@ class BlurDetectionInference:
         
         self.input_size = self.config['model']['input_size']
         self.threshold = self.config['model']['classical_threshold']
+        self.max_side = self.config['model'].get('classical_max_side')
+        
+        # BF16 autocast where the GPU supports it, FP16 otherwise
+        self._amp_dtype = torch.bfloat16 if (
+            self.device.type == "cuda" and torch.cuda.is_bf16_supported()
+        ) else torch.float16
+        
+        # Stencils for the on-device classical metrics: Laplacian, Sobel x, Sobel y
+        self.use_gpu_classical = self.device.type == "cuda"
+        if self.use_gpu_classical:
+            self._stencils = torch.tensor(
+                [
+                    [[0, 1, 0], [1, -4, 1], [0, 1, 0]],
+                    [[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]],
+                    [[-1, -2, -1], [0, 0, 0], [1, 2, 1]],
+                ],
+                dtype=torch.float32,
+                device=self.device,
+            ).unsqueeze(1)
+            self._fft_masks = {}
+            self._resize_weights = {}
+            
+            # H2D copies go through a pinned staging frame on their own
+            # stream; the CNN runs on a second stream alongside the
+            # classical kernels
+            self._pinned_frame = None
+            self._copy_stream = torch.cuda.Stream(device=self.device)
+            self._cnn_stream = torch.cuda.Stream(device=self.device)
+        
+        # Reusable preprocessing buffers: resize/RGB scratch, a (pinned) host
+        # tensor the normalized planes are written into, and its device copy
+        size = self.input_size
+        self._resize_buf = np.empty((size, size, 3), dtype=np.uint8)
+        self._rgb_buf = np.empty((size, size, 3), dtype=np.uint8)
+        self._host = torch.empty(
+            (1, 3, size, size), dtype=torch.float32,
+            pin_memory=self.device.type == "cuda"
+        )
+        self._host_np = self._host.numpy()[0]
+        self._dev = self._host if self.device.type != "cuda" else \
+            torch.empty((1, 3, size, size), dtype=torch.float32, device=self.device)
+        
+        # TorchInductor fuses the Conv/BN/ReLU/Pool chain into generated kernels
+        self.compiled = False
+        if (
+            compile_model
+            and self.model is not None
+            and not self.quantized
+            and hasattr(torch, "compile")
+        ):
+            self._compile_model()
+        
+    def _compile_model(self):
+        """Compile the eager CNN and trigger compilation with a warm-up forward"""
+        eager_model = self.model
+        # max-autotune benchmarks kernels for minutes at load on CPU
+        mode = "reduce-overhead" if self.device.type == "cuda" else "default"
+        self.model = torch.compile(eager_model, mode=mode, fullgraph=True)
+        
+        dummy = torch.zeros(1, 3, self.input_size, self.input_size, device=self.device)
+        try:
+            self._cnn_probs(dummy)
+            self.compiled = True
+            print(f"✓ Compiled CNN model (torch.compile, mode={mode})")
+        except Exception as e:
+            self.model = eager_model
+            print(f"⚠ torch.compile failed, using eager CNN: {e}")
+        
+    def _on_gpu(self, image: np.ndarray) -> bool:
+        """Whether a frame takes the on-device path (3-channel BGR on CUDA)"""
+        return self.use_gpu_classical and image.ndim == 3 and image.shape[2] == 3
+    
+    def _upload_image(self, image: np.ndarray) -> torch.Tensor:
+        """
+        Copy a BGR frame to the device once as an RGB float tensor
+        
+        The copy is queued on the copy stream; consumers must call
+        _wait_upload on their stream before reading the result.
+        
+        Args:
+            image: Input image (BGR format, uint8)
+            
+        Returns:
+            Tensor [1, 3, H, W] in the 0-255 range
+        """
+        if self._pinned_frame is None or tuple(self._pinned_frame.shape) != image.shape:
+            self._pinned_frame = torch.empty(image.shape, dtype=torch.uint8, pin_memory=True)
+        self._pinned_frame.numpy()[...] = image
+        
+        with torch.cuda.stream(self._copy_stream):
+            tensor = self._pinned_frame.to(self.device, non_blocking=True)
+            return tensor.permute(2, 0, 1).flip(0).unsqueeze(0).float()
+    
+    def _wait_upload(self, image_tensor: torch.Tensor, stream=None):
+        """Order `stream` (default: current) after the upload of image_tensor"""
+        stream = stream or torch.cuda.current_stream(self.device)
+        stream.wait_stream(self._copy_stream)
+        image_tensor.record_stream(stream)
+    
+    def _classical_gpu(self, image_tensor: torch.Tensor) -> Tuple[bool, float, Dict[str, float]]:
+        """
+        Classical blur metrics computed on the device
+        
+        Args:
+            image_tensor: Uploaded frame [1, 3, H, W] (RGB, 0-255)
+            
+        Returns:
+            Tuple of (is_blurred, score, all_metrics), same as BlurDetector.detect_blur
+        """
+        # Round like cv2.cvtColor so thresholds match the CPU path
+        gray = rgb_to_grayscale(image_tensor).round()
+        rows, cols = gray.shape[-2:]
+        if self.max_side is not None and max(rows, cols) > self.max_side:
+            # Separable INTER_AREA weights, rounded back to uint8 levels like
+            # cv2.resize, so both paths see the same downsampled frame
+            rows_out, cols_out = BlurDetector.downsample_shape((rows, cols), self.max_side)
+            weights_y, weights_x = self._area_weights(rows, rows_out), self._area_weights(cols, cols_out)
+            gray = (weights_y @ gray @ weights_x.T).round()
+        
+        # Reflect padding matches OpenCV's default BORDER_REFLECT_101
+        responses = F.conv2d(F.pad(gray, (1, 1, 1, 1), mode="reflect"), self._stencils)
+        laplacian, grad_x, grad_y = responses[0]
+        
+        lap_var = laplacian.var(unbiased=False)
+        sobel_grad = torch.sqrt(grad_x * grad_x + grad_y * grad_y).mean()
+        
+        spectrum = torch.fft.fftshift(torch.fft.fft2(gray[0, 0])).abs()
+        shape = tuple(spectrum.shape)
+        center_mask = self._fft_masks.get(shape)
+        if center_mask is None:
+            center_mask = torch.from_numpy(
+                BlurDetector._center_mask(*shape).copy()
+            ).to(self.device)
+            self._fft_masks[shape] = center_mask
+        fft_ratio = 1.0 - spectrum[center_mask].sum() / (spectrum.sum() + 1e-8)
+        
+        # Single device sync for all three scalars
+        lap_var, sobel_grad, fft_ratio = torch.stack(
+            [lap_var, sobel_grad, fft_ratio]
+        ).tolist()
+        
+        # Report decisive frames exactly like the CPU short-circuit
+        shortcut = BlurDetector.laplacian_shortcut(lap_var, threshold=self.threshold)
+        if shortcut is not None:
+            return shortcut
+        
+        metrics = {
+            "laplacian_variance": lap_var,
+            "sobel_gradient": sobel_grad,
+            "fft_high_freq_ratio": fft_ratio
+        }
+        is_blurred, score = BlurDetector.score_metrics(
+            metrics, threshold=self.threshold, method="combined"
+        )
+        return is_blurred, score, metrics
+    
+    def _area_weights(self, n_in: int, n_out: int) -> torch.Tensor:
+        """Device copy of BlurDetector.area_weights, cached per size"""
+        key = (n_in, n_out)
+        weights = self._resize_weights.get(key)
+        if weights is None:
+            weights = torch.from_numpy(
+                BlurDetector.area_weights(n_in, n_out).copy()
+            ).to(self.device)
+            self._resize_weights[key] = weights
+        return weights
+    
+    def _preprocess_tensor(self, image_tensor: torch.Tensor) -> torch.Tensor:
+        """
+        CNN preprocessing for a frame already on the device
+        
+        Args:
+            image_tensor: Uploaded frame [1, 3, H, W] (RGB, 0-255)
+            
+        Returns:
+            Preprocessed tensor [1, 3, input_size, input_size]
+        """
+        resized = F.interpolate(
+            image_tensor,
+            size=(self.input_size, self.input_size),
+            mode="bilinear",
+            align_corners=False,
+        )
+        return resized / 255.0
         
     def preprocess_image(self, image: np.ndarray) -> torch.Tensor:
         """
@@ -64,73 +289,126 @@ class BlurDetectionInference:
             image: Input image (BGR format)
             
         Returns:
-            Preprocessed tensor [1, 3, H, W]
+            Preprocessed tensor [1, 3, H, W]. This is a reused buffer that
+            is overwritten by the next call; clone it to keep it.
+        """
+        # Resize first so the colour conversion touches the small image
+        cv2.resize(image, (self.input_size, self.input_size), dst=self._resize_buf)
+        cv2.cvtColor(self._resize_buf, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        
+        # Normalize to [0, 1], writing HWC -> CHW straight into the host tensor
+        np.divide(self._rgb_buf.transpose(2, 0, 1), 255.0, out=self._host_np)
+        
+        if self._dev is not self._host:
+            self._dev.copy_(self._host, non_blocking=True)
+        return self._dev
+    
+    def _cnn_probs(self, input_tensor: torch.Tensor) -> torch.Tensor:
         """
-        # Convert BGR to RGB
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        Run the blur CNN and return class probabilities
         
-        # Resize
-        resized = cv2.resize(rgb_image, (self.input_size, self.input_size))
+        Args:
+            input_tensor: Preprocessed batch [N, 3, H, W]
+            
+        Returns:
+            Softmax probabilities [N, 2] (class 0: sharp, class 1: blurred)
+        """
+        if self.session is not None:
+            logits = self.session.run(
+                None, {self._session_input: input_tensor.cpu().numpy()}
+            )[0]
+            return F.softmax(torch.from_numpy(logits), dim=1)
         
-        # Normalize to [0, 1]
-        normalized = resized.astype(np.float32) / 255.0
+        if self.quantized:
+            input_tensor = input_tensor.cpu()
+            with torch.inference_mode():
+                return F.softmax(self.model(input_tensor), dim=1)
         
-        # Convert to tensor and add batch dimension
-        tensor = torch.from_numpy(normalized).permute(2, 0, 1).unsqueeze(0)
+        use_amp = self.device.type == "cuda"
+        if use_amp:
+            input_tensor = input_tensor.contiguous(memory_format=torch.channels_last)
         
-        return tensor.to(self.device)
+        with torch.inference_mode(), torch.autocast(
+            device_type=self.device.type, dtype=self._amp_dtype, enabled=use_amp
+        ):
+            logits = self.model(input_tensor)
+        return F.softmax(logits.float(), dim=1)
     
-    def detect_blur(
+    def _classical(
         self,
         image: np.ndarray,
-        method: str = "hybrid"
-    ) -> Dict[str, any]:
+        image_tensor: Optional[torch.Tensor] = None
+    ) -> Tuple[Optional[torch.Tensor], Dict[str, any]]:
         """
-        Detect blur in image
+        Compute classical metrics and the partial result dictionary
         
         Args:
             image: Input image (BGR format)
-            method: "classical", "cnn", or "hybrid"
+            image_tensor: Frame already queued by _upload_image (CUDA only)
             
         Returns:
-            Dictionary with detection results
+            Tuple of (uploaded frame tensor or None, partial results)
         """
+        # On CUDA the frame is uploaded once and shared by the classical
+        # metrics and the CNN input. Grayscale frames stay on the CPU path.
+        if self._on_gpu(image):
+            if image_tensor is None:
+                image_tensor = self._upload_image(image)
+            self._wait_upload(image_tensor)
+            is_blurred_classical, classical_score, metrics = \
+                self._classical_gpu(image_tensor)
+        else:
+            is_blurred_classical, classical_score, metrics = \
+                self.classical_detector.detect_blur(
+                    image,
+                    threshold=self.threshold,
+                    method="combined",
+                    max_side=self.max_side
+                )
+        
         results = {
             "is_blurred": False,
             "confidence": 0.0,
-            "method": method,
-            "classical_metrics": {},
-            "cnn_prediction": None
+            "classical_metrics": metrics,
+            "cnn_prediction": None,
+            "classical_score": classical_score,
+            "is_blurred_classical": is_blurred_classical
         }
+        return image_tensor, results
+    
+    def _cnn_input(self, image: np.ndarray, image_tensor: Optional[torch.Tensor]) -> torch.Tensor:
+        """Preprocess for the CNN, reusing the uploaded frame when there is one"""
+        if image_tensor is not None:
+            return self._preprocess_tensor(image_tensor)
+        return self.preprocess_image(image)
+    
+    def _finalize(
+        self,
+        results: Dict[str, any],
+        method: str,
+        blur_prob: Optional[float] = None
+    ) -> Dict[str, any]:
+        """
+        Attach the CNN prediction and make the final decision
         
-        # Classical metrics (always compute)
-        is_blurred_classical, classical_score, metrics = \
-            self.classical_detector.detect_blur(
-                image,
-                threshold=self.threshold,
-                method="combined"
-            )
-        
-        results["classical_metrics"] = metrics
-        results["classical_score"] = classical_score
-        results["is_blurred_classical"] = is_blurred_classical
+        Args:
+            results: Partial results from _classical
+            method: "classical", "cnn", or "hybrid"
+            blur_prob: CNN blur probability (None if the CNN was not run)
+            
+        Returns:
+            Dictionary with detection results
+        """
+        results["method"] = method
+        is_blurred_classical = results["is_blurred_classical"]
+        classical_score = results["classical_score"]
         
-        # CNN prediction (if available and requested)
-        if self.use_cnn and method in ["cnn", "hybrid"]:
-            input_tensor = self.preprocess_image(image)
-            
-            with torch.no_grad():
-                logits = self.model(input_tensor)
-                probs = F.softmax(logits, dim=1)
-                
-                # Class 0: sharp, Class 1: blurred
-                blur_prob = probs[0, 1].item()
-                is_blurred_cnn = blur_prob > 0.5
-                
-                results["cnn_prediction"] = {
-                    "blur_probability": blur_prob,
-                    "is_blurred": is_blurred_cnn
-                }
+        if blur_prob is not None:
+            # Class 0: sharp, Class 1: blurred
+            results["cnn_prediction"] = {
+                "blur_probability": blur_prob,
+                "is_blurred": blur_prob > 0.5
+            }
         
         # Final decision based on method
         if method == "classical":
@@ -166,21 +444,92 @@ class BlurDetectionInference:
         
         return results
     
-    def batch_detect(self, images: list) -> list:
+    def detect_blur(
+        self,
+        image: np.ndarray,
+        method: str = "hybrid"
+    ) -> Dict[str, any]:
+        """
+        Detect blur in image
+        
+        Args:
+            image: Input image (BGR format)
+            method: "classical", "cnn", or "hybrid"
+            
+        Returns:
+            Dictionary with detection results
+        """
+        run_cnn = self.use_cnn and method in ["cnn", "hybrid"]
+        
+        if run_cnn and self._on_gpu(image):
+            # Queue the CNN on its own stream behind the upload, then run the
+            # classical kernels on the current stream while it executes
+            image_tensor = self._upload_image(image)
+            with torch.cuda.stream(self._cnn_stream):
+                self._wait_upload(image_tensor, self._cnn_stream)
+                probs = self._cnn_probs(self._preprocess_tensor(image_tensor))
+            
+            _, results = self._classical(image, image_tensor)
+            
+            current = torch.cuda.current_stream(self.device)
+            current.wait_stream(self._cnn_stream)
+            # ONNX Runtime and the INT8 model return CPU tensors
+            if probs.is_cuda:
+                probs.record_stream(current)
+            return self._finalize(results, method, probs[0, 1].item())
+        
+        # Classical metrics (always compute)
+        image_tensor, results = self._classical(image)
+        
+        # CNN prediction (if available and requested)
+        blur_prob = None
+        if run_cnn:
+            probs = self._cnn_probs(self._cnn_input(image, image_tensor))
+            blur_prob = probs[0, 1].item()
+        
+        return self._finalize(results, method, blur_prob)
+    
+    def batch_detect(self, images: list, method: str = "hybrid") -> list:
         """
         Detect blur in batch of images
         
         Args:
             images: List of images
+            method: "classical", "cnn", or "hybrid"
             
         Returns:
             List of detection results
         """
-        results = []
-        for image in images:
-            result = self.detect_blur(image)
-            results.append(result)
-        return results
+        if not images:
+            return []
+        
+        # Classical metrics: OpenCV releases the GIL, so a thread pool
+        # overlaps the CPU path; the GPU path is already asynchronous
+        if self.use_gpu_classical:
+            classical = [self._classical(image) for image in images]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(images), os.cpu_count() or 1)) as pool:
+                classical = list(pool.map(self._classical, images))
+        
+        # One CNN forward for the whole batch
+        blur_probs = [None] * len(images)
+        if self.use_cnn and method in ["cnn", "hybrid"]:
+            batch = torch.empty(
+                (len(images), 3, self.input_size, self.input_size),
+                dtype=torch.float32, device=self.device
+            )
+            for i, (image, (image_tensor, _)) in enumerate(zip(images, classical)):
+                batch[i].copy_(self._cnn_input(image, image_tensor)[0])
+            
+            # One symbolic-batch graph instead of a recompile per batch size
+            if self.compiled and len(images) > 1:
+                torch._dynamo.mark_dynamic(batch, 0)
+            blur_probs = self._cnn_probs(batch)[:, 1].tolist()
+        
+        return [
+            self._finalize(results, method, blur_prob)
+            for (_, results), blur_prob in zip(classical, blur_probs)
+        ]
 
 
 # Test function
@@ -227,7 +576,7 @@ if __name__ == "__main__":
     print(f"Method: {result['method']}")
     print("\nClassical Metrics:")
     for metric, value in result['classical_metrics'].items():
-        print(f"  {metric}: {value:.2f}")
+        print(f"  {metric}: {'skipped' if value is None else f'{value:.2f}'}")
     
     if result['cnn_prediction']:
         print("\nCNN Prediction:")
@@ -0,0 +1,81 @@
+"""
+Post-training INT8 quantization of the blur detection CNN
+FX graph mode static quantization, calibrated on validation images
+"""
+
+import torch
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+from torch.utils.data import DataLoader
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from tqdm import tqdm
+from ai_pipeline.blur_detection.cnn_model import create_blur_classifier
+from ai_pipeline.blur_detection.train import BlurDataset
+
+
+def quantize_blur_classifier(
+    model: torch.nn.Module,
+    calibration_loader: DataLoader,
+    num_batches: int = 10,
+    backend: str = "x86"
+) -> torch.nn.Module:
+    """
+    Statically quantize a trained blur classifier to INT8
+
+    Args:
+        model: Trained FP32 blur classifier
+        calibration_loader: Loader yielding (images, labels) batches
+        num_batches: Number of batches used to calibrate activation ranges
+        backend: Quantized engine ("x86" or "qnnpack" for ARM)
+
+    Returns:
+        Quantized model (CPU only)
+    """
+    torch.backends.quantized.engine = backend
+    model = model.cpu().eval()
+
+    example_inputs = (next(iter(calibration_loader))[0],)
+    qconfig_mapping = get_default_qconfig_mapping(backend)
+    prepared = prepare_fx(model, qconfig_mapping, example_inputs)
+
+    with torch.no_grad():
+        for i, (images, _) in enumerate(tqdm(calibration_loader, desc="Calibrating")):
+            if i >= num_batches:
+                break
+            prepared(images)
+
+    return convert_fx(prepared)
+
+
+def main():
+    """Quantize the best blur classifier checkpoint"""
+
+    model_path = Path("ai_pipeline/blur_detection/models/blur_classifier_best.pth")
+    output_path = model_path.with_name("blur_classifier_int8.pt")
+
+    model = create_blur_classifier("standard")
+    checkpoint = torch.load(model_path, map_location="cpu")
+    model.load_state_dict(checkpoint.get("model_state_dict", checkpoint))
+
+    calibration_dataset = BlurDataset("data/datasets/processed/blur_detection/val")
+    calibration_loader = DataLoader(calibration_dataset, batch_size=32, shuffle=True)
+
+    quantized = quantize_blur_classifier(model, calibration_loader)
+
+    # TorchScript keeps the quantized graph loadable without re-running FX
+    example_input = torch.randn(1, 3, 224, 224)
+    scripted = torch.jit.trace(quantized, example_input)
+    torch.jit.save(scripted, str(output_path))
+
+    fp32_mb = model_path.stat().st_size / (1024**2)
+    int8_mb = output_path.stat().st_size / (1024**2)
+    print(f"✓ Saved INT8 model to {output_path} ({int8_mb:.2f} MB, FP32 was {fp32_mb:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
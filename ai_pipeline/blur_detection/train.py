@@ -2,13 +2,14 @@
 Train blur detection CNN model
 """
 
+import os
+import cv2
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
 from torch.utils.data import Dataset, DataLoader
-from torchvision import transforms
 from pathlib import Path
-from PIL import Image
 import sys
 
 # Add parent directory to path
@@ -18,52 +19,63 @@ from tqdm import tqdm
 from ai_pipeline.blur_detection.cnn_model import create_blur_classifier
 
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# ImageNet normalization, shaped for HWC broadcasting
+MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(1, 1, 3)
+INV_STD = (1.0 / np.array([0.229, 0.224, 0.225], dtype=np.float32)).reshape(1, 1, 3)
+
+
 class BlurDataset(Dataset):
     """Blur detection dataset"""
     
-    def __init__(self, data_dir, transform=None):
+    def __init__(self, data_dir, image_size=224):
         self.data_dir = Path(data_dir)
-        self.transform = transform
+        self.image_size = image_size
         
-        # Load images
-        self.samples = []
+        # Load images: parallel path/label arrays instead of a list of tuples
+        self.paths = []
+        labels = []
         
-        # Blurred images (label = 1)
-        blurred_dir = self.data_dir / "blurred"
-        if blurred_dir.exists():
-            for img_path in blurred_dir.glob("*.[jp][pn]g"):
-                self.samples.append((img_path, 1))
-            for img_path in blurred_dir.glob("*.[JP][PN]G"):
-                self.samples.append((img_path, 1))
+        # Blurred images (label = 1), sharp images (label = 0)
+        for class_name, label in (("blurred", 1), ("sharp", 0)):
+            class_dir = self.data_dir / class_name
+            if not class_dir.exists():
+                continue
+            with os.scandir(class_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        self.paths.append(entry.path)
+                        labels.append(label)
         
-        # Sharp images (label = 0)
-        sharp_dir = self.data_dir / "sharp"
-        if sharp_dir.exists():
-            for img_path in sharp_dir.glob("*.[jp][pn]g"):
-                self.samples.append((img_path, 0))
-            for img_path in sharp_dir.glob("*.[JP][PN]G"):
-                self.samples.append((img_path, 0))
+        self.labels = np.array(labels, dtype=np.int8)
         
-        print(f"Loaded {len(self.samples)} samples from {data_dir}")
+        print(f"Loaded {len(self.paths)} samples from {data_dir}")
     
     def __len__(self):
-        return len(self.samples)
+        return len(self.paths)
     
     def __getitem__(self, idx):
-        img_path, label = self.samples[idx]
+        img_path, label = self.paths[idx], int(self.labels[idx])
         
         try:
             # Load image
-            image = Image.open(img_path).convert('RGB')
+            image = cv2.imread(img_path, cv2.IMREAD_COLOR)
+            if image is None:
+                raise IOError("unreadable image")
             
-            if self.transform:
-                image = self.transform(image)
+            image = cv2.resize(
+                image, (self.image_size, self.image_size), interpolation=cv2.INTER_AREA
+            )
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             
-            return image, label
+            # Normalize and convert HWC -> CHW
+            array = (image.astype(np.float32) / 255.0 - MEAN) * INV_STD
+            return torch.from_numpy(np.ascontiguousarray(array.transpose(2, 0, 1))), label
         except Exception as e:
             print(f"Error loading {img_path}: {e}")
             # Return a dummy sample
-            return torch.zeros(3, 224, 224), 0
+            return torch.zeros(3, self.image_size, self.image_size), 0
 
 
 def train_blur_detector():
@@ -77,22 +89,28 @@ def train_blur_detector():
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     print(f"Using device: {device}\n")
     
-    # Data transforms
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-    ])
-    
     # Datasets
-    train_dataset = BlurDataset("data/datasets/processed/blur_detection/train", transform)
-    val_dataset = BlurDataset("data/datasets/processed/blur_detection/val", transform)
+    train_dataset = BlurDataset("data/datasets/processed/blur_detection/train")
+    val_dataset = BlurDataset("data/datasets/processed/blur_detection/val")
     
-    train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True, num_workers=0)  # num_workers=0 for Windows
-    val_loader = DataLoader(val_dataset, batch_size=32, shuffle=False, num_workers=0)
+    # Worker processes need the spawn-safe entry point on Windows, so keep 0 there
+    num_workers = 0 if sys.platform == "win32" else 4
+    pin_memory = device.type == "cuda"
     
-    # Model
+    train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True,
+                              num_workers=num_workers, pin_memory=pin_memory)
+    val_loader = DataLoader(val_dataset, batch_size=32, shuffle=False,
+                            num_workers=num_workers, pin_memory=pin_memory)
+    
+    # Model (NHWC lets cuDNN pick tensor-core conv kernels)
     model = create_blur_classifier().to(device)
+    model = model.to(memory_format=torch.channels_last)
+    
+    # Mixed precision on CUDA: BF16 where supported (no loss scaling needed),
+    # otherwise FP16 with a GradScaler
+    use_amp = device.type == "cuda"
+    amp_dtype = torch.bfloat16 if use_amp and torch.cuda.is_bf16_supported() else torch.float16
+    scaler = torch.cuda.amp.GradScaler(enabled=use_amp and amp_dtype == torch.float16)
     
     # FIXED: Use CrossEntropyLoss for 2-class output
     criterion = nn.CrossEntropyLoss()
@@ -113,17 +131,19 @@ def train_blur_detector():
         train_correct = 0
         
         for images, labels in tqdm(train_loader, desc="Training"):
-            images = images.to(device)
-            labels = labels.to(device)  # Keep as long tensor for CrossEntropyLoss
+            images = images.to(device, memory_format=torch.channels_last, non_blocking=True)
+            labels = labels.to(device, non_blocking=True)  # Keep as long tensor for CrossEntropyLoss
             
             # Forward
             optimizer.zero_grad()
-            outputs = model(images)  # Shape: [batch_size, 2]
-            loss = criterion(outputs, labels)
+            with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                outputs = model(images)  # Shape: [batch_size, 2]
+                loss = criterion(outputs, labels)
             
             # Backward
-            loss.backward()
-            optimizer.step()
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
             
             # Stats
             train_loss += loss.item()
@@ -140,11 +160,12 @@ def train_blur_detector():
         
         with torch.no_grad():
             for images, labels in tqdm(val_loader, desc="Validation"):
-                images = images.to(device)
-                labels = labels.to(device)
+                images = images.to(device, memory_format=torch.channels_last, non_blocking=True)
+                labels = labels.to(device, non_blocking=True)
                 
-                outputs = model(images)
-                loss = criterion(outputs, labels)
+                with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                    outputs = model(images)
+                    loss = criterion(outputs, labels)
                 
                 val_loss += loss.item()
                 predictions = outputs.argmax(dim=1)
@@ -0,0 +1,231 @@
+"""
+Export NAFNet to ONNX and build an INT8 TensorRT engine for edge deployment
+Calibrated on blurred wagon crops (entropy calibration)
+"""
+
+import os
+import cv2
+import numpy as np
+import torch
+from pathlib import Path
+from typing import List, Optional
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from ai_pipeline.deblurring.model import create_nafnet_deblur
+
+try:
+    import tensorrt as trt
+    TRT_AVAILABLE = True
+except ImportError:
+    TRT_AVAILABLE = False
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def export_onnx(
+    model: torch.nn.Module,
+    onnx_path: str,
+    tile_size: int = 512,
+    opset_version: int = 17
+) -> str:
+    """
+    Export NAFNet to ONNX with dynamic batch and spatial axes
+
+    Args:
+        model: NAFNet model (FP32)
+        onnx_path: Output .onnx path
+        tile_size: Spatial size of the dummy input
+        opset_version: ONNX opset
+
+    Returns:
+        Path to the exported model
+    """
+    model = model.cpu().eval()
+    dummy = torch.zeros(1, 3, tile_size, tile_size)
+
+    torch.onnx.export(
+        model,
+        dummy,
+        onnx_path,
+        opset_version=opset_version,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={
+            "input": {0: "batch", 2: "h", 3: "w"},
+            "output": {0: "batch", 2: "h", 3: "w"}
+        }
+    )
+    return onnx_path
+
+
+def load_calibration_batch(image_paths: List[Path], crop_size: int) -> np.ndarray:
+    """Load center crops as a normalized [N, 3, crop, crop] RGB float32 batch"""
+    batch = np.empty((len(image_paths), 3, crop_size, crop_size), dtype=np.float32)
+
+    for k, path in enumerate(image_paths):
+        image = cv2.imread(str(path))
+        if min(image.shape[:2]) < crop_size:
+            image = cv2.resize(image, (crop_size, crop_size))
+        h, w = image.shape[:2]
+        y, x = (h - crop_size) // 2, (w - crop_size) // 2
+        crop = image[y:y + crop_size, x:x + crop_size, ::-1]
+        batch[k] = crop.transpose(2, 0, 1) * (1.0 / 255.0)
+
+    return batch
+
+
+if TRT_AVAILABLE:
+
+    class NAFNetCalibrator(trt.IInt8EntropyCalibrator2):
+        """Feeds blurred crops to TensorRT; device memory is held by torch"""
+
+        def __init__(self, image_paths: List[Path], cache_path: str,
+                     batch_size: int = 4, crop_size: int = 256):
+            super().__init__()
+            self.image_paths = image_paths
+            self.cache_path = cache_path
+            self.batch_size = batch_size
+            self.crop_size = crop_size
+            self.index = 0
+            self.device_input = torch.empty(
+                batch_size, 3, crop_size, crop_size, dtype=torch.float32, device="cuda"
+            )
+
+        def get_batch_size(self):
+            return self.batch_size
+
+        def get_batch(self, names):
+            if self.index + self.batch_size > len(self.image_paths):
+                return None
+
+            paths = self.image_paths[self.index:self.index + self.batch_size]
+            self.index += self.batch_size
+            batch = load_calibration_batch(paths, self.crop_size)
+            self.device_input.copy_(torch.from_numpy(batch))
+            return [int(self.device_input.data_ptr())]
+
+        def read_calibration_cache(self):
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, "rb") as f:
+                    return f.read()
+            return None
+
+        def write_calibration_cache(self, cache):
+            with open(self.cache_path, "wb") as f:
+                f.write(cache)
+
+
+def build_int8_engine(
+    onnx_path: str,
+    engine_path: str,
+    calibration_dir: str,
+    cache_path: str,
+    tile_size: int = 512,
+    max_batch: int = 8,
+    crop_size: int = 256,
+    num_calibration_images: int = 256
+) -> Optional[str]:
+    """
+    Build an INT8 (FP16 fallback) TensorRT engine from the ONNX model
+
+    Args:
+        onnx_path: Exported NAFNet ONNX model
+        engine_path: Output serialized engine path
+        calibration_dir: Directory of blurred wagon images
+        cache_path: Calibration cache (reused by later builds / trtexec --calib)
+        tile_size: Largest spatial size the engine accepts
+        max_batch: Largest tile batch the engine accepts
+        crop_size: Calibration crop size
+        num_calibration_images: Number of calibration images
+
+    Returns:
+        Engine path, or None if TensorRT is not installed
+    """
+    if not TRT_AVAILABLE:
+        print("⚠ TensorRT not installed, skipping engine build")
+        return None
+
+    logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(logger)
+    network = builder.create_network(
+        1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH)
+    )
+    parser = trt.OnnxParser(network, logger)
+
+    with open(onnx_path, "rb") as f:
+        if not parser.parse(f.read()):
+            errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+            raise RuntimeError("Failed to parse ONNX model:\n" + "\n".join(errors))
+
+    config = builder.create_builder_config()
+    config.set_flag(trt.BuilderFlag.INT8)
+    config.set_flag(trt.BuilderFlag.FP16)
+
+    # Tiles are at most tile_size; smaller full images go through the same engine
+    profile = builder.create_optimization_profile()
+    profile.set_shape(
+        "input",
+        (1, 3, 32, 32),
+        (max_batch, 3, tile_size, tile_size),
+        (max_batch, 3, tile_size, tile_size)
+    )
+    config.add_optimization_profile(profile)
+
+    calib_profile = builder.create_optimization_profile()
+    calib_shape = (4, 3, crop_size, crop_size)
+    calib_profile.set_shape("input", calib_shape, calib_shape, calib_shape)
+    config.set_calibration_profile(calib_profile)
+
+    image_paths = sorted(
+        p for p in Path(calibration_dir).iterdir()
+        if p.suffix.lower() in IMAGE_EXTENSIONS
+    )[:num_calibration_images]
+    config.int8_calibrator = NAFNetCalibrator(image_paths, cache_path, crop_size=crop_size)
+
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("TensorRT engine build failed")
+
+    with open(engine_path, "wb") as f:
+        f.write(serialized)
+    return engine_path
+
+
+def main():
+    """Export the best NAFNet checkpoint to ONNX and an INT8 TensorRT engine"""
+
+    model_dir = Path("ai_pipeline/deblurring/models")
+    model_path = model_dir / "nafnet_deblur_best.pth"
+    onnx_path = model_dir / "nafnet.onnx"
+    engine_path = model_dir / "nafnet_int8.trt"
+    cache_path = model_dir / "nafnet_calib.cache"
+
+    model = create_nafnet_deblur("small")
+    checkpoint = torch.load(model_path, map_location="cpu")
+    model.load_state_dict(checkpoint.get("model_state_dict", checkpoint))
+
+    export_onnx(model, str(onnx_path))
+    print(f"✓ Exported ONNX model to {onnx_path}")
+
+    built = build_int8_engine(
+        str(onnx_path),
+        str(engine_path),
+        "data/datasets/processed/deblurring/val/blurred",
+        str(cache_path)
+    )
+    if built:
+        print(f"✓ Saved INT8 TensorRT engine to {engine_path}")
+    else:
+        # Build on the Jetson instead, reusing the calibration cache if present
+        print(
+            f"trtexec --onnx={onnx_path} --int8 --fp16 --calib={cache_path} "
+            f"--minShapes=input:1x3x32x32 --optShapes=input:8x3x512x512 "
+            f"--maxShapes=input:8x3x512x512 --saveEngine={engine_path}"
+        )
+
+
+if __name__ == "__main__":
+    main()
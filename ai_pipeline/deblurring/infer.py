@@ -3,16 +3,57 @@ Deblurring inference using NAFNet
 Processes blurred images to restore sharp details
 """
 
+import functools
 import cv2
 import numpy as np
 import torch
 import torch.nn.functional as F
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from pathlib import Path
 import yaml
 
 from ai_pipeline.deblurring.model import create_nafnet_deblur
 
+try:
+    import tensorrt as trt
+    TRT_AVAILABLE = True
+except ImportError:
+    TRT_AVAILABLE = False
+
+
+@functools.lru_cache(maxsize=4)
+def _fade_ramp(fade_size: int) -> np.ndarray:
+    """0 -> 1 blend ramp, shared by every tile edge (read-only, cached)"""
+    ramp = np.linspace(0, 1, fade_size, dtype=np.float32)
+    ramp.setflags(write=False)
+    return ramp
+
+
+def _edge_profile(n: int, fade_size: int) -> np.ndarray:
+    """1D weight profile: ones with both ends faded"""
+    profile = np.ones(n, dtype=np.float32)
+    if fade_size > 0:
+        ramp = _fade_ramp(fade_size)
+        profile[:fade_size] *= ramp
+        profile[-fade_size:] *= ramp[::-1]
+    return profile
+
+
+@functools.lru_cache(maxsize=8)
+def _compute_tile_weights(h: int, w: int, overlap: int) -> np.ndarray:
+    """
+    Compute blending weights for tile
+    Center has weight 1, edges fade to 0. Cached per (h, w, overlap) and
+    returned read-only, since nearly every tile shares the same shape.
+    """
+    # Edge fades are separable: the 2D map is the outer product of the row
+    # and column profiles (one pass instead of four strided multiplies)
+    fade_size = overlap // 2
+    weight = np.outer(_edge_profile(h, fade_size), _edge_profile(w, fade_size))
+    
+    weight.setflags(write=False)
+    return weight
+
 
 class DeblurInference:
     """NAFNet-based motion deblurring inference"""
@@ -21,7 +62,8 @@ class DeblurInference:
         self,
         config_path: str = "ai_pipeline/configs/deblurring.yaml",
         model_path: Optional[str] = None,
-        device: str = "cpu"
+        device: str = "cpu",
+        compile_model: bool = True
     ):
         """
         Initialize deblurring inference
@@ -30,6 +72,7 @@ class DeblurInference:
             config_path: Path to configuration file
             model_path: Path to trained model checkpoint
             device: Device to run on ("cpu" or "cuda")
+            compile_model: Compile NAFNet with torch.compile
         """
         self.device = torch.device(device)
         
@@ -63,9 +106,172 @@ class DeblurInference:
         else:
             print("ℹ Using untrained model (for testing/demo)")
         
+        # NHWC keeps cuDNN on its tensor-core conv kernels (no layout transposes)
+        self.model = self.model.to(memory_format=torch.channels_last)
+        
         self.tile_size = self.config.get('inference', {}).get('tile_size', 512)
         self.tile_overlap = self.config.get('inference', {}).get('tile_overlap', 32)
         
+        # Tiles per forward pass in tiled mode
+        self.max_batch = self.config.get('inference', {}).get('max_batch') or \
+            (8 if self.device.type == "cuda" else 1)
+        
+        # Same-shape images per forward pass in batch_deblur
+        self.batch_size = self.config.get('inference', {}).get('batch_size', 8)
+        
+        # Side stream for uploading the next image while the current one is
+        # deblurred; double-buffered pinned staging so a buffer is never
+        # overwritten while its async copy is in flight
+        self.copy_stream = None
+        if self.device.type == "cuda":
+            # Tiles are always padded to tile_size, so the conv algorithm
+            # search runs once per shape and is then reused
+            torch.backends.cudnn.benchmark = True
+            
+            self.copy_stream = torch.cuda.Stream(device=self.device)
+            self._pinned_slot = 0
+            self._pinned = [None, None]
+            self._pinned_np = [None, None]
+            self._pinned_events = [None, None]
+        
+        # INT8 TensorRT engine (see export_trt.py) replaces the torch forward
+        self.trt_context = None
+        engine_path = self.config.get('inference', {}).get('trt_engine')
+        if engine_path and self.device.type == "cuda":
+            self._maybe_load_trt(engine_path)
+        
+        # On CPU, script + freeze (no Inductor/C++ toolchain needed at load);
+        # on CUDA, Inductor fuses LayerNorm2d/SimpleGate/SCA pointwise ops
+        if self.trt_context is None and compile_model:
+            if self.device.type == "cpu":
+                self._script_model()
+            elif hasattr(torch, "compile"):
+                self._compile_model()
+            
+            # Pay the remaining first-call cost (full tile batches, common
+            # frame sizes) here instead of on the first real image
+            self.warmup(self.config.get('inference', {}).get('warmup_shapes') or [])
+    
+    def _maybe_load_trt(self, engine_path: str) -> bool:
+        """Load a serialized TensorRT engine; on any failure keep the torch model"""
+        if not TRT_AVAILABLE or not Path(engine_path).exists():
+            print(f"ℹ TensorRT engine not available ({engine_path}), using PyTorch model")
+            return False
+        
+        try:
+            runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+            with open(engine_path, 'rb') as f:
+                self.trt_engine = runtime.deserialize_cuda_engine(f.read())
+            self.trt_context = self.trt_engine.create_execution_context()
+            # Input shapes the engine was built for (optimization profile 0)
+            self.trt_min_shape, _, self.trt_max_shape = (
+                tuple(shape) for shape in self.trt_engine.get_tensor_profile_shape("input", 0)
+            )
+        except Exception as e:
+            self.trt_context = None
+            print(f"⚠ Failed to load TensorRT engine, using PyTorch model: {e}")
+            return False
+        
+        print(f"✓ Loaded TensorRT deblurring engine from {engine_path}")
+        return True
+    
+    def _trt_accepts(self, shape: Tuple[int, ...]) -> bool:
+        """Whether an input shape lies inside the engine's optimization profile"""
+        return all(
+            low <= dim <= high
+            for dim, low, high in zip(shape, self.trt_min_shape, self.trt_max_shape)
+        )
+    
+    def _forward_trt(self, input_tensor: torch.Tensor) -> torch.Tensor:
+        """Run the TensorRT engine on the current CUDA stream"""
+        # The engine expects contiguous NCHW float32
+        input_tensor = input_tensor.contiguous()
+        output_tensor = torch.empty_like(input_tensor)
+        
+        if not self.trt_context.set_input_shape("input", tuple(input_tensor.shape)):
+            raise RuntimeError(f"TensorRT engine rejected input shape {tuple(input_tensor.shape)}")
+        self.trt_context.set_tensor_address("input", input_tensor.data_ptr())
+        self.trt_context.set_tensor_address("output", output_tensor.data_ptr())
+        if not self.trt_context.execute_async_v3(torch.cuda.current_stream().cuda_stream):
+            raise RuntimeError("TensorRT inference failed")
+        return output_tensor
+        
+    def _compile_model(self):
+        """Compile NAFNet for static shapes and pay the compile cost with a warm-up"""
+        eager_model = self.model
+        mode = "reduce-overhead" if self.device.type == "cuda" else "default"
+        self.model = torch.compile(eager_model, mode=mode, dynamic=False)
+        
+        dummy = torch.zeros(1, 3, self.tile_size, self.tile_size, device=self.device)
+        try:
+            self._forward(dummy.contiguous(memory_format=torch.channels_last))
+            print(f"✓ Compiled deblurring model (torch.compile, mode={mode})")
+        except Exception as e:
+            self.model = eager_model
+            print(f"⚠ torch.compile failed, using eager model: {e}")
+        
+    def warmup(self, shapes: List[Tuple[int, int]]):
+        """
+        Run two dummy forwards per input shape
+        
+        Args:
+            shapes: Frame sizes as (height, width); a full tile batch
+                (max_batch x tile_size x tile_size) is always included
+        """
+        batches = [(self.max_batch, self.tile_size, self.tile_size)]
+        batches += [(1, h, w) for h, w in shapes]
+        batches = list(dict.fromkeys(batches))
+        
+        for n, h, w in batches:
+            dummy = torch.zeros(n, 3, h, w, device=self.device)
+            dummy = dummy.contiguous(memory_format=torch.channels_last)
+            for _ in range(2):
+                self._forward(dummy)
+        
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+    
+    def inference_context(self):
+        """
+        Context that skips TorchScript profiling/optimization
+        
+        For single-shot calls on unseen shapes where first-call latency
+        matters more than steady-state throughput.
+        """
+        return torch.jit.optimized_execution(False)
+    
+    def _configure_cpu_threads(self):
+        """
+        Apply inference.num_threads / num_interop_threads when configured
+        
+        Torch thread pools are process-wide, so they are left to the caller
+        unless the config opts in.
+        """
+        inference_cfg = self.config.get('inference', {})
+        num_threads = inference_cfg.get('num_threads')
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        
+        # Only settable before the first inter-op parallel work in the process
+        num_interop_threads = inference_cfg.get('num_interop_threads')
+        if num_interop_threads:
+            try:
+                torch.set_num_interop_threads(num_interop_threads)
+            except RuntimeError:
+                pass
+    
+    def _script_model(self):
+        """Script and freeze NAFNet (constant folding, pointwise fusion)"""
+        eager_model = self.model
+        try:
+            self.model = torch.jit.freeze(torch.jit.script(eager_model))
+            self._configure_cpu_threads()
+            # warmup() runs the two profiling-executor calls per shape
+            print("✓ Scripted and froze deblurring model (TorchScript)")
+        except Exception as e:
+            self.model = eager_model
+            print(f"⚠ TorchScript failed, using eager model: {e}")
+    
     def preprocess(self, image: np.ndarray) -> torch.Tensor:
         """
         Preprocess image for model
@@ -76,16 +282,67 @@ class DeblurInference:
         Returns:
             Preprocessed tensor [1, 3, H, W]
         """
-        # Convert BGR to RGB
-        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        # Transfer uint8 (4x fewer bytes than float32); pinned for async H2D
+        if self.device.type == "cuda":
+            tensor = self._upload(image)
+        else:
+            tensor = torch.from_numpy(image)
         
-        # Convert to float and normalize to [0, 1]
-        tensor = torch.from_numpy(rgb).float() / 255.0
+        # Permute to [C, H, W]; BGR -> RGB is a channel flip on the small
+        # uint8 tensor instead of a separate cv2.cvtColor pass
+        tensor = tensor.permute(2, 0, 1).flip(0)
         
-        # Permute to [C, H, W] and add batch dimension
-        tensor = tensor.permute(2, 0, 1).unsqueeze(0)
+        # Convert to float, normalize to [0, 1] and add batch dimension (on device)
+        tensor = tensor.float().mul_(1.0 / 255.0).unsqueeze(0)
+        return tensor.contiguous(memory_format=torch.channels_last)
+    
+    def _upload(self, image: np.ndarray) -> torch.Tensor:
+        """Stage a uint8 frame in a reusable pinned buffer and copy it to the device"""
+        slot = self._pinned_slot = 1 - self._pinned_slot
+        
+        # Wait for the previous copy out of this slot before overwriting it
+        if self._pinned_events[slot] is not None:
+            self._pinned_events[slot].synchronize()
+        
+        if self._pinned[slot] is None or self._pinned[slot].numel() < image.size:
+            self._pinned[slot] = torch.empty(image.size, dtype=torch.uint8, pin_memory=True)
+            self._pinned_np[slot] = self._pinned[slot].numpy()
+        np.copyto(self._pinned_np[slot][:image.size].reshape(image.shape), image)
+        
+        staged = self._pinned[slot][:image.size].view(image.shape)
+        tensor = staged.to(self.device, non_blocking=True)
+        
+        event = torch.cuda.Event()
+        event.record(torch.cuda.current_stream(self.device))
+        self._pinned_events[slot] = event
+        return tensor
+    
+    def _prefetch(self, images: List[np.ndarray]) -> torch.Tensor:
+        """Preprocess same-shape images into one batch, on the copy stream if any"""
+        if self.copy_stream is None:
+            return torch.cat([self.preprocess(image) for image in images])
         
-        return tensor.to(self.device)
+        with torch.cuda.stream(self.copy_stream):
+            return torch.cat([self.preprocess(image) for image in images])
+    
+    def _wait_upload(self, input_tensor: torch.Tensor):
+        """Order the compute stream after a prefetched upload"""
+        stream = torch.cuda.current_stream(self.device)
+        stream.wait_stream(self.copy_stream)
+        input_tensor.record_stream(stream)
+    
+    def _forward(self, input_tensor: torch.Tensor) -> torch.Tensor:
+        """Run NAFNet, in FP16 autocast on CUDA; returns a float32 tensor"""
+        # Shapes outside the engine profile (see deblur()) use the torch model
+        if self.trt_context is not None and self._trt_accepts(tuple(input_tensor.shape)):
+            return self._forward_trt(input_tensor)
+        
+        with torch.inference_mode(), torch.autocast(
+            device_type="cuda", dtype=torch.float16,
+            enabled=self.device.type == "cuda"
+        ):
+            output_tensor = self.model(input_tensor)
+        return output_tensor.float()
     
     def postprocess(self, tensor: torch.Tensor) -> np.ndarray:
         """
@@ -97,19 +354,17 @@ class DeblurInference:
         Returns:
             Output image (BGR format, uint8)
         """
-        # Remove batch dimension and move to CPU
-        output = tensor.squeeze(0).cpu()
-        
-        # Clamp to [0, 1] and convert to [0, 255]
-        output = torch.clamp(output, 0, 1) * 255.0
+        # Remove batch dimension
+        output = tensor.squeeze(0)
         
-        # Convert to numpy and permute to [H, W, C]
-        image = output.permute(1, 2, 0).numpy().astype(np.uint8)
+        # Clamp to [0, 1] and convert to [0, 255] on device
+        output = torch.clamp(output, 0, 1).mul_(255.0).to(torch.uint8)
         
-        # Convert RGB back to BGR
-        bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        # RGB -> BGR as a channel flip, then permute to [H, W, C]
+        bgr = output.flip(0).permute(1, 2, 0).contiguous()
         
-        return bgr
+        # Only the uint8 image crosses back to the host
+        return bgr.cpu().numpy()
     
     def deblur(self, image: np.ndarray, use_tiling: bool = False) -> np.ndarray:
         """
@@ -124,8 +379,13 @@ class DeblurInference:
         """
         h, w = image.shape[:2]
         
-        # Use tiling for large images to save memory
-        if use_tiling and (h > self.tile_size or w > self.tile_size):
+        # Use tiling for large images to save memory; frames the TensorRT
+        # engine's profile cannot take whole are tiled too
+        too_large = h > self.tile_size or w > self.tile_size
+        outside_engine = (
+            self.trt_context is not None and not self._trt_accepts((1, 3, h, w))
+        )
+        if too_large and (use_tiling or outside_engine):
             return self._deblur_tiled(image)
         else:
             return self._deblur_full(image)
@@ -133,9 +393,7 @@ class DeblurInference:
     def _deblur_full(self, image: np.ndarray) -> np.ndarray:
         """Deblur entire image at once"""
         input_tensor = self.preprocess(image)
-        
-        with torch.no_grad():
-            output_tensor = self.model(input_tensor)
+        output_tensor = self._forward(input_tensor)
         
         output_image = self.postprocess(output_tensor)
         return output_image
@@ -154,74 +412,125 @@ class DeblurInference:
         n_tiles_h = (h - overlap) // stride + 1
         n_tiles_w = (w - overlap) // stride + 1
         
-        # Initialize output
-        output = np.zeros_like(image, dtype=np.float32)
-        weight_map = np.zeros((h, w), dtype=np.float32)
-        
-        # Process each tile
+        # Tile coordinates
+        coords = []
         for i in range(n_tiles_h):
             for j in range(n_tiles_w):
-                # Calculate tile coordinates
                 y1 = i * stride
                 x1 = j * stride
-                y2 = min(y1 + tile_size, h)
-                x2 = min(x1 + tile_size, w)
-                
-                # Extract tile
+                coords.append((y1, x1, min(y1 + tile_size, h), min(x1 + tile_size, w)))
+        
+        # Initialize output
+        output = np.zeros_like(image, dtype=np.float32)
+        weight_map = np.zeros((h, w), dtype=np.float32)
+        
+        # Full-size tiles share one blend weight map (higher in center);
+        # only edge tiles need their own
+        weight_full = self._compute_tile_weights(tile_size, tile_size, overlap)
+        
+        # Scratch buffer for weighted tiles, reused across tiles
+        tile_buf = np.empty((tile_size, tile_size, image.shape[2]), dtype=np.float32)
+        
+        # Process tiles in mini-batches, one model call per batch
+        for start in range(0, len(coords), self.max_batch):
+            batch_coords = coords[start:start + self.max_batch]
+            
+            # Pad edge tiles to full size so every tile in a batch matches
+            tiles = []
+            for y1, x1, y2, x2 in batch_coords:
                 tile = image[y1:y2, x1:x2]
+                pad_h, pad_w = tile_size - (y2 - y1), tile_size - (x2 - x1)
+                if pad_h or pad_w:
+                    tile = cv2.copyMakeBorder(tile, 0, pad_h, 0, pad_w, cv2.BORDER_REFLECT_101)
+                tiles.append(tile)
+            
+            input_tensor = torch.cat([self.preprocess(tile) for tile in tiles])
+            output_tensor = self._forward(input_tensor)
+            
+            for k, (y1, x1, y2, x2) in enumerate(batch_coords):
+                tile_h, tile_w = y2 - y1, x2 - x1
+                tile_deblurred = self.postprocess(output_tensor[k:k + 1])[:tile_h, :tile_w]
                 
-                # Deblur tile
-                tile_deblurred = self._deblur_full(tile)
-                
-                # Compute blend weights (higher in center)
-                tile_h, tile_w = tile.shape[:2]
-                weight = self._compute_tile_weights(tile_h, tile_w, overlap)
+                if tile_h == tile_size and tile_w == tile_size:
+                    weight = weight_full
+                else:
+                    weight = self._compute_tile_weights(tile_h, tile_w, overlap)
                 
-                # Accumulate
-                output[y1:y2, x1:x2] += tile_deblurred.astype(np.float32) * weight[:, :, np.newaxis]
+                # Accumulate in place (no per-tile float32 temporaries)
+                weighted = tile_buf[:tile_h, :tile_w]
+                np.multiply(tile_deblurred, weight[:, :, np.newaxis], out=weighted)
+                out_region = output[y1:y2, x1:x2]
+                np.add(out_region, weighted, out=out_region)
                 weight_map[y1:y2, x1:x2] += weight
         
-        # Normalize by weights
-        output = output / (weight_map[:, :, np.newaxis] + 1e-8)
-        output = np.clip(output, 0, 255).astype(np.uint8)
+        # Normalize by weights and clip in place; the uint8 cast is the only
+        # full-size allocation after accumulation
+        weight_map += 1e-8
+        np.divide(output, weight_map[:, :, np.newaxis], out=output)
+        np.clip(output, 0, 255, out=output)
         
-        return output
+        return output.astype(np.uint8)
     
     def _compute_tile_weights(self, h: int, w: int, overlap: int) -> np.ndarray:
         """
         Compute blending weights for tile
-        Center has weight 1, edges fade to 0
+        Center has weight 1, edges fade to 0 (read-only, cached)
         """
-        weight = np.ones((h, w), dtype=np.float32)
-        
-        # Fade edges
-        fade_size = overlap // 2
-        if fade_size > 0:
-            # Top
-            weight[:fade_size, :] *= np.linspace(0, 1, fade_size)[:, np.newaxis]
-            # Bottom
-            weight[-fade_size:, :] *= np.linspace(1, 0, fade_size)[:, np.newaxis]
-            # Left
-            weight[:, :fade_size] *= np.linspace(0, 1, fade_size)[np.newaxis, :]
-            # Right
-            weight[:, -fade_size:] *= np.linspace(1, 0, fade_size)[np.newaxis, :]
-        
-        return weight
+        return _compute_tile_weights(h, w, overlap)
     
-    def batch_deblur(self, images: list) -> list:
+    def batch_deblur(self, images: list, use_tiling: bool = False) -> list:
         """
         Deblur batch of images
         
         Args:
             images: List of input images
+            use_tiling: Use tiled inference for large images (as in deblur)
             
         Returns:
             List of deblurred images
         """
-        results = []
-        for image in images:
-            deblurred = self.deblur(image)
-            results.append(deblurred)
+        results = [None] * len(images)
+        
+        # Group full-frame images by shape into chunks of batch_size; images
+        # deblur() would tile go through the tiled path one at a time
+        groups = {}
+        tiled = []
+        for idx, image in enumerate(images):
+            h, w = image.shape[:2]
+            too_large = h > self.tile_size or w > self.tile_size
+            outside_engine = (
+                self.trt_context is not None and not self._trt_accepts((1, 3, h, w))
+            )
+            if too_large and (use_tiling or outside_engine):
+                tiled.append(idx)
+            else:
+                groups.setdefault(image.shape, []).append(idx)
+        
+        chunks = [
+            indices[start:start + self.batch_size]
+            for indices in groups.values()
+            for start in range(0, len(indices), self.batch_size)
+        ]
+        
+        # Enter inference mode once for the whole batch
+        with torch.inference_mode():
+            next_input = self._prefetch([images[i] for i in chunks[0]]) if chunks else None
+            for c, chunk in enumerate(chunks):
+                input_tensor = next_input
+                if self.copy_stream is not None:
+                    self._wait_upload(input_tensor)
+                output_tensor = self._forward(input_tensor)
+                
+                # Upload the next chunk while this one is on the GPU
+                if c + 1 < len(chunks):
+                    next_input = self._prefetch([images[i] for i in chunks[c + 1]])
+                
+                for k, idx in enumerate(chunk):
+                    results[idx] = self.postprocess(output_tensor[k:k + 1])
+            
+            for idx in tiled:
+                results[idx] = self._deblur_tiled(images[idx])
+        
         return results
 
 
@@ -268,7 +577,8 @@ if __name__ == "__main__":
     print("Deblurring...")
     start_time = time.time()
     
-    deblurred = deblurrer.deblur(image, use_tiling=False)
+    with deblurrer.inference_context():
+        deblurred = deblurrer.deblur(image, use_tiling=False)
     
     elapsed = time.time() - start_time
     print(f"✓ Deblurring completed in {elapsed:.2f}s\n")
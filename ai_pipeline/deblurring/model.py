@@ -10,32 +10,18 @@ import torch.nn.functional as F
 from typing import List
 
 
-class LayerNormFunction(torch.autograd.Function):
-    """Custom Layer Normalization"""
-    
-    @staticmethod
-    def forward(ctx, x, weight, bias, eps):
-        ctx.eps = eps
-        N, C, H, W = x.size()
-        mu = x.mean(1, keepdim=True)
-        var = (x - mu).pow(2).mean(1, keepdim=True)
-        y = (x - mu) / (var + eps).sqrt()
-        ctx.save_for_backward(y, var, weight)
-        y = weight.view(1, C, 1, 1) * y + bias.view(1, C, 1, 1)
-        return y
-    
-    @staticmethod
-    def backward(ctx, grad_output):
-        eps = ctx.eps
-        N, C, H, W = grad_output.size()
-        y, var, weight = ctx.saved_variables
-        g = grad_output * weight.view(1, C, 1, 1)
-        mean_g = g.mean(dim=1, keepdim=True)
-        
-        mean_gy = (g * y).mean(dim=1, keepdim=True)
-        gx = 1. / torch.sqrt(var + eps) * (g - y * mean_gy - mean_g)
-        return gx, (grad_output * y).sum(dim=3).sum(dim=2).sum(dim=0), \
-               grad_output.sum(dim=3).sum(dim=2).sum(dim=0), None
+@torch.jit.script
+def layer_norm_2d(x: torch.Tensor, weight: torch.Tensor, bias: torch.Tensor, eps: float) -> torch.Tensor:
+    """
+    Per-pixel LayerNorm over channels of an (N, C, H, W) tensor
+    Scripted so the mean/var/normalize/affine pointwise chain (and its
+    autodiff backward) fuses into a few kernels instead of ~9 separate ops
+    """
+    mu = x.mean(1, keepdim=True)
+    xc = x - mu
+    var = xc.pow(2).mean(1, keepdim=True)
+    y = xc * torch.rsqrt(var + eps)
+    return weight.view(1, -1, 1, 1) * y + bias.view(1, -1, 1, 1)
 
 
 class LayerNorm2d(nn.Module):
@@ -48,15 +34,15 @@ class LayerNorm2d(nn.Module):
         self.eps = eps
     
     def forward(self, x):
-        return LayerNormFunction.apply(x, self.weight, self.bias, self.eps)
+        return layer_norm_2d(x, self.weight, self.bias, self.eps)
 
 
 class SimpleGate(nn.Module):
     """Simple Gate mechanism (replaces nonlinear activations)"""
     
     def forward(self, x):
-        x1, x2 = x.chunk(2, dim=1)
-        return x1 * x2
+        c = x.shape[1] // 2
+        return x[:, :c] * x[:, c:]
 
 
 class NAFBlock(nn.Module):
@@ -99,18 +85,25 @@ class NAFBlock(nn.Module):
         x = self.conv1(x)
         x = self.conv2(x)
         x = self.sg(x)
-        x = x * self.sca(x)
+        if self.training:
+            x = x * self.sca(x)
+        else:
+            # x is the gate's fresh output; scale it in place when no
+            # autograd graph needs the unscaled values
+            x.mul_(self.sca(x))
         x = self.conv3(x)
         x = self.dropout1(x)
         
-        y = inp + x * self.beta
+        # Residual scale-and-add as a single kernel (addcmul), on CPU and
+        # CUDA alike and with or without scripting
+        y = torch.addcmul(inp, x, self.beta)
         
         x = self.conv4(self.norm2(y))
         x = self.sg(x)
         x = self.conv5(x)
         x = self.dropout2(x)
         
-        return y + x * self.gamma
+        return torch.addcmul(y, x, self.gamma)
 
 
 class NAFNet(nn.Module):
@@ -186,9 +179,10 @@ class NAFNet(nn.Module):
         
         x = self.middle_blks(x)
         
-        for decoder, up, enc_skip in zip(self.decoders, self.ups, encs[::-1]):
+        # Skips are consumed deepest-first; pop() keeps the loop scriptable
+        for decoder, up in zip(self.decoders, self.ups):
             x = up(x)
-            x = x + enc_skip
+            x = x + encs.pop()
             x = decoder(x)
         
         x = self.ending(x)
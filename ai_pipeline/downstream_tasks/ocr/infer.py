@@ -5,11 +5,15 @@ Detection + Recognition integrated
 
 import cv2
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+import queue
+import threading
 import time
+import yaml
 
-from ai_pipeline.downstream_tasks.ocr.text_detector import TextDetector
+from ai_pipeline.downstream_tasks.ocr.text_detector import TextDetector, PADDLE_AVAILABLE
 from ai_pipeline.downstream_tasks.ocr.recognizer import TextRecognizer
+from ai_pipeline.downstream_tasks.ocr.paddle_runtime import create_paddle_ocr
 
 
 class OCRPipeline:
@@ -17,8 +21,22 @@ class OCRPipeline:
     
     def __init__(self, config_path: str = "ai_pipeline/configs/ocr.yaml"):
         """Initialize OCR pipeline"""
-        self.detector = TextDetector(config_path)
-        self.recognizer = TextRecognizer(config_path)
+        # One PaddleOCR instance (det + rec) shared by both stages
+        paddle_ocr = None
+        if PADDLE_AVAILABLE:
+            with open(config_path, 'r') as f:
+                paddle_ocr = create_paddle_ocr(yaml.safe_load(f))
+        
+        self.detector = TextDetector(config_path, paddle_ocr=paddle_ocr)
+        self.recognizer = TextRecognizer(config_path, paddle_ocr=paddle_ocr)
+        
+        # Single det -> rec call when both stages run on the shared model and
+        # crops need no custom preprocessing
+        self.fused = (
+            paddle_ocr is not None
+            and self.detector.use_paddle
+            and not self.recognizer.preprocess_for_paddle
+        )
         print("✓ OCR Pipeline initialized")
     
     def process_image(self, image: np.ndarray) -> Dict:
@@ -33,6 +51,16 @@ class OCRPipeline:
         """
         start_time = time.time()
         
+        fused = self.detect_and_recognize(image) if self.fused else None
+        if fused is not None:
+            detections, recognitions, stage_times = fused
+            total_time = time.time() - start_time
+            return self.summarize(detections, recognitions, {
+                'detection': stage_times.get('det', 0.0),
+                'recognition': stage_times.get('rec', 0.0),
+                'total': total_time
+            })
+        
         # Detect text regions
         det_start = time.time()
         detections = self.detector.detect(image)
@@ -45,6 +73,54 @@ class OCRPipeline:
         
         total_time = time.time() - start_time
         
+        return self.summarize(detections, recognitions, {
+            'detection': det_time,
+            'recognition': rec_time,
+            'total': total_time
+        })
+    
+    def detect_and_recognize(self, image: np.ndarray) -> Optional[Tuple[List[dict], List[dict], Dict]]:
+        """
+        Run detection and recognition in one PaddleOCR call
+        
+        Calls the det -> rec system directly rather than ocr(), which
+        discards the per-stage timings. That call is a PaddleOCR 2.x
+        internal (TextSystem.__call__ returning (boxes, rec_res, times) from
+        2.6 on); on any other shape the fused path is switched off.
+        
+        Args:
+            image: Input image (BGR)
+            
+        Returns:
+            (detections, recognitions, PaddleOCR stage times keyed 'det'/'rec'),
+            or None if the installed PaddleOCR does not support the fused
+            call and the separate stages must be used
+        """
+        try:
+            result = self.detector.paddle_ocr(image, cls=False)
+        except TypeError:
+            result = None
+        if not (isinstance(result, tuple) and len(result) == 3 and isinstance(result[2], dict)):
+            print("⚠ Installed PaddleOCR does not support the fused det -> rec call, "
+                  "using separate detection and recognition")
+            self.fused = False
+            return None
+        
+        boxes, texts, stage_times = result
+        boxes, texts = boxes if boxes is not None else [], texts or []
+        
+        detections = self.detector.to_detections(
+            [np.asarray(box, dtype=np.float32) for box in boxes], image.shape[:2]
+        )
+        rec_results = [
+            {'text': text, 'confidence': confidence, 'method': 'paddleocr'}
+            for text, confidence in texts
+        ]
+        return detections, self.recognizer.build_results(detections, rec_results), stage_times
+    
+    @staticmethod
+    def summarize(detections: List[dict], recognitions: List[dict], timing: Dict) -> Dict:
+        """Build the per-image OCR result dict"""
         # Extract valid wagon IDs
         wagon_ids = [
             r for r in recognitions 
@@ -56,11 +132,7 @@ class OCRPipeline:
             'num_recognized': len(recognitions),
             'wagon_ids': wagon_ids,
             'all_recognitions': recognitions,
-            'timing': {
-                'detection': det_time,
-                'recognition': rec_time,
-                'total': total_time
-            }
+            'timing': timing
         }
     
     def visualize_results(self, image: np.ndarray, results: Dict) -> np.ndarray:
@@ -89,6 +161,158 @@ class OCRPipeline:
         return vis
 
 
+class PipelineRunner:
+    """
+    Three-stage threaded OCR pipeline: frame reading -> detection -> recognition
+    
+    Stages are connected by bounded queues so reading/decoding the next
+    frames and detecting text overlap with recognition. The recognition
+    stage batches crops across frames, flushing when at least `rec_batch`
+    regions are pending or the oldest pending frame has waited `max_wait_ms`.
+    """
+    
+    _STOP = object()
+    
+    def __init__(
+        self,
+        pipeline: OCRPipeline,
+        queue_size: int = 8,
+        rec_batch: int = 32,
+        max_wait_ms: float = 20.0
+    ):
+        self.pipeline = pipeline
+        self.queue_size = queue_size
+        self.rec_batch = rec_batch
+        self.max_wait = max_wait_ms / 1000.0
+    
+    def run(self, frames: Iterable[np.ndarray]) -> Iterator[Tuple[int, Dict]]:
+        """
+        Run OCR over a stream of frames
+        
+        Args:
+            frames: Iterable of BGR images (e.g. a video reader generator)
+            
+        Yields:
+            (frame_index, result) in input order; result matches process_image
+        """
+        det_queue = queue.Queue(maxsize=self.queue_size)
+        rec_queue = queue.Queue(maxsize=self.queue_size)
+        out_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        
+        def put(q, item):
+            # Poll so a stopped pipeline never leaves a producer blocked
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+        
+        def guarded(worker, out):
+            def wrapper():
+                try:
+                    worker()
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+                finally:
+                    put(out, self._STOP)
+            return wrapper
+        
+        def prep_worker():
+            for frame_id, image in enumerate(frames):
+                if stop.is_set():
+                    return
+                put(det_queue, (frame_id, image, time.time()))
+        
+        def det_worker():
+            while not stop.is_set():
+                try:
+                    item = det_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is self._STOP:
+                    return
+                frame_id, image, start_time = item
+                det_start = time.time()
+                detections = self.pipeline.detector.detect(image)
+                put(rec_queue, (frame_id, image, detections, start_time, time.time() - det_start))
+        
+        def rec_worker():
+            # Pending entries: (frame_id, image, detections, start, det_time, arrival)
+            pending = []
+            upstream_done = False
+            while not stop.is_set():
+                # Sleep at most until the oldest pending frame is due
+                timeout = 0.1
+                if pending:
+                    timeout = min(timeout, max(0.0, pending[0][5] + self.max_wait - time.time()))
+                try:
+                    item = rec_queue.get(timeout=timeout)
+                    if item is self._STOP:
+                        upstream_done = True
+                    else:
+                        pending.append(item + (time.time(),))
+                except queue.Empty:
+                    pass
+                
+                num_regions = sum(len(p[2]) for p in pending)
+                if pending and (
+                    upstream_done or num_regions >= self.rec_batch
+                    or time.time() - pending[0][5] >= self.max_wait
+                ):
+                    self._recognize_pending(pending, lambda result: put(out_queue, result))
+                    pending = []
+                
+                if upstream_done:
+                    return
+        
+        threads = [
+            threading.Thread(target=guarded(prep_worker, det_queue), daemon=True),
+            threading.Thread(target=guarded(det_worker, rec_queue), daemon=True),
+            threading.Thread(target=guarded(rec_worker, out_queue), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        
+        try:
+            while True:
+                try:
+                    item = out_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        break
+                    continue
+                if item is self._STOP:
+                    break
+                yield item
+        finally:
+            # Also reached when the caller stops iterating early
+            stop.set()
+            for thread in threads:
+                thread.join()
+        
+        if errors:
+            raise errors[0]
+    
+    def _recognize_pending(self, pending: List[tuple], emit):
+        """One batched recognition over all pending frames, then emit results"""
+        rec_start = time.time()
+        recognitions = self.pipeline.recognizer.recognize_batch(
+            [(image, detections) for _, image, detections, _, _, _ in pending]
+        )
+        rec_time = time.time() - rec_start
+        
+        for (frame_id, _, detections, start_time, det_time, _), recs in zip(pending, recognitions):
+            emit((frame_id, self.pipeline.summarize(detections, recs, {
+                'detection': det_time,
+                'recognition': rec_time,
+                'total': time.time() - start_time
+            })))
+
+
 # Test
 if __name__ == "__main__":
     import sys
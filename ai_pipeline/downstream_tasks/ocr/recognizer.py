@@ -4,10 +4,12 @@ Text recognition for wagon numbers
 
 import cv2
 import numpy as np
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Any
 import re
 import yaml
 
+from ai_pipeline.downstream_tasks.ocr.paddle_runtime import create_paddle_ocr
+
 
 try:
     from paddleocr import PaddleOCR
@@ -16,26 +18,44 @@ except ImportError:
     PADDLE_AVAILABLE = False
 
 
+class _KeepChars(dict):
+    """str.translate table that keeps the given characters and deletes all others"""
+    
+    def __init__(self, chars: str):
+        super().__init__((ord(c), ord(c)) for c in chars)
+    
+    def __missing__(self, key):
+        return None
+
+
 class TextRecognizer:
     """Recognize text from detected regions"""
     
-    def __init__(self, config_path: str = "ai_pipeline/configs/ocr.yaml"):
+    def __init__(self, config_path: str = "ai_pipeline/configs/ocr.yaml", paddle_ocr: Optional[Any] = None):
+        """
+        Initialize text recognizer
+        
+        Args:
+            config_path: OCR config
+            paddle_ocr: Shared PaddleOCR instance (see create_paddle_ocr);
+                the cached one for this config is used when not given
+        """
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
         
         self.rec_config = self.config.get('recognition', {})
+        self.pre_config = self.config.get('preprocessing', {})
         self.post_config = self.config.get('postprocessing', {})
         
         self.use_paddle = PADDLE_AVAILABLE
+        self.text_recognizer = None
         
         if self.use_paddle:
-            self.paddle_ocr = PaddleOCR(
-                use_angle_cls=False,
-                lang='en',
-                det=False,
-                rec=True,
-                show_log=False
-            )
+            # Shared with the detector (one det + rec instance per config)
+            self.paddle_ocr = paddle_ocr if paddle_ocr is not None else create_paddle_ocr(self.config)
+            # Batched calls through PaddleOCR 2.x's internal text_recognizer;
+            # switched off (public ocr() instead) if it behaves differently
+            self.text_recognizer = getattr(self.paddle_ocr, 'text_recognizer', None)
             print("✓ PaddleOCR recognizer initialized")
         else:
             print("ℹ Recognition requires PaddleOCR (pip install paddleocr)")
@@ -45,26 +65,157 @@ class TextRecognizer:
             'wagon_id_pattern',
             r'^[A-Z]{2,4}[0-9]{4,8}$'
         )
+        self.wagon_re = re.compile(self.wagon_pattern)
+        
+        # Character filter as one translate table (runs in C per string)
+        self.char_filter = None
+        if self.post_config.get('filter_special_chars', True):
+            self.char_filter = _KeepChars(
+                self.post_config.get('allowed_chars', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-')
+            )
         self.min_confidence = self.post_config.get('min_confidence', 0.6)
         
+        # PaddleOCR's rec model is trained on natural crops; CLAHE + Otsu
+        # costs CPU per crop and tends to hurt accuracy, so it is opt-in
+        self.preprocess_for_paddle = self.pre_config.get('preprocess_for_paddle', False)
+        
+        # Built once; creating a CLAHE object per crop dominated preprocessing
+        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        
     def preprocess_for_ocr(self, image: np.ndarray) -> np.ndarray:
         """Preprocess text region for better OCR"""
-        # Convert to grayscale
+        # Convert to grayscale (a fresh buffer either way, so the steps
+        # below can work in place without touching the caller's image)
         if len(image.shape) == 3:
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         else:
-            gray = image
+            gray = image.copy()
         
-        # Increase contrast
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(gray)
+        # Increase contrast (in place)
+        self.clahe.apply(gray, gray)
         
-        # Threshold
-        _, binary = cv2.threshold(
-            enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+        # Threshold (in place). The crop keeps its own buffer because
+        # crops are batched before recognition.
+        cv2.threshold(
+            gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=gray
         )
         
-        return binary
+        return gray
+    
+    def _crop(self, image: np.ndarray, box) -> np.ndarray:
+        """
+        Crop the axis-aligned bounds of a box, clipped to the image
+        
+        `box` is either a point array or a precomputed, already clipped
+        (x0, y0, x1, y1) tuple (the detector's 'aabb'), which is sliced directly.
+        """
+        if isinstance(box, tuple):
+            x_min, y_min, x_max, y_max = box
+            return image[y_min:y_max, x_min:x_max]
+        
+        h, w = image.shape[:2]
+        box = box.astype(np.int32)
+        
+        # Clamp both corners to [0, W] x [0, H] in one go
+        x_min, y_min = np.clip(box.min(axis=0), 0, (w, h))
+        x_max, y_max = np.clip(box.max(axis=0), 0, (w, h))
+        
+        return image[y_min:y_max, x_min:x_max]
+    
+    def recognize_regions(self, image: np.ndarray, boxes: List[np.ndarray]) -> List[Dict]:
+        """
+        Recognize text in several regions with one batched recognizer call
+        
+        Args:
+            image: Full image
+            boxes: Bounding box coordinates (or precomputed aabb tuples) per region
+            
+        Returns:
+            Recognition result dict per box (same order)
+        """
+        return self.recognize_regions_batch([(image, boxes)])[0]
+    
+    def recognize_regions_batch(
+        self,
+        items: List[Tuple[np.ndarray, List[np.ndarray]]]
+    ) -> List[List[Dict]]:
+        """
+        Recognize regions from several images with one batched recognizer call
+        
+        Args:
+            items: (image, boxes) pairs
+            
+        Returns:
+            Per image, a recognition result dict per box (same order)
+        """
+        results = [
+            [{'text': '', 'confidence': 0.0, 'method': 'none'} for _ in boxes]
+            for _, boxes in items
+        ]
+        if not self.use_paddle:
+            return results
+        
+        # Crop (and optionally preprocess) every region, skipping empty crops
+        processed, slots = [], []
+        for i, (image, boxes) in enumerate(items):
+            for k, box in enumerate(boxes):
+                roi = self._crop(image, box)
+                if roi.size > 0:
+                    processed.append(
+                        self.preprocess_for_ocr(roi) if self.preprocess_for_paddle else roi
+                    )
+                    slots.append((i, k))
+        
+        if not processed:
+            return results
+        
+        for (i, k), (text, confidence) in zip(slots, self._recognize_crops(processed)):
+            results[i][k] = {
+                'text': text,
+                'confidence': confidence,
+                'method': 'paddleocr'
+            }
+        
+        return results
+    
+    def _recognize_crops(self, crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """
+        Run the recognition model over a list of crops
+        
+        PaddleOCR's text_recognizer batches the crops (rec_batch_num) through
+        one model call. It is a 2.x internal returning (rec_res, elapse); on
+        any other shape it is dropped and ocr(det=False) is used, which
+        returns one [(text, confidence)] list per crop.
+        
+        Returns:
+            (text, confidence) per crop (same order)
+        """
+        rec_results = None
+        if self.text_recognizer is not None:
+            # The recognizer expects 3-channel crops (ocr() converts these itself)
+            bgr_crops = [
+                cv2.cvtColor(crop, cv2.COLOR_GRAY2BGR) if crop.ndim == 2 else crop
+                for crop in crops
+            ]
+            try:
+                result = self.text_recognizer(bgr_crops)
+            except TypeError:
+                result = None
+            if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+                rec_results = result[0]
+            else:
+                print("⚠ PaddleOCR text_recognizer not usable, recognizing through ocr()")
+                self.text_recognizer = None
+        
+        if rec_results is None:
+            result = self.paddle_ocr.ocr(crops, det=False, rec=True, cls=False)
+            rec_results = [rec[0] if rec else ('', 0.0) for rec in result]
+        
+        if len(rec_results) != len(crops):
+            raise RuntimeError(
+                f"PaddleOCR returned {len(rec_results)} recognition results for {len(crops)} crops"
+            )
+        return [(text, float(confidence)) for text, confidence in rec_results]
     
     def recognize_region(self, image: np.ndarray, box: np.ndarray) -> Dict:
         """
@@ -72,32 +223,22 @@ class TextRecognizer:
         
         Args:
             image: Full image
-            box: Bounding box coordinates
+            box: Bounding box coordinates (or a precomputed aabb tuple)
             
         Returns:
             Recognition result dict
         """
-        # Crop region
-        box = box.astype(np.int32)
-        x_min = max(0, box[:, 0].min())
-        y_min = max(0, box[:, 1].min())
-        x_max = min(image.shape[1], box[:, 0].max())
-        y_max = min(image.shape[0], box[:, 1].max())
-        
-        roi = image[y_min:y_max, x_min:x_max]
+        roi = self._crop(image, box)
         
         if roi.size == 0:
             return {'text': '', 'confidence': 0.0}
         
-        # Preprocess
-        processed = self.preprocess_for_ocr(roi)
-        
         # Recognize
         if self.use_paddle:
-            result = self.paddle_ocr.ocr(processed, det=False, rec=True, cls=False)
+            processed = self.preprocess_for_ocr(roi) if self.preprocess_for_paddle else roi
+            text, confidence = self._recognize_crops([processed])[0]
             
-            if result and len(result) > 0 and len(result[0]) > 0:
-                text, confidence = result[0][0]
+            if text:
                 return {
                     'text': text,
                     'confidence': confidence,
@@ -110,9 +251,8 @@ class TextRecognizer:
     def postprocess_text(self, text: str) -> str:
         """Clean up recognized text"""
         # Remove special characters
-        if self.post_config.get('filter_special_chars', True):
-            allowed = self.post_config.get('allowed_chars', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-')
-            text = ''.join(c for c in text if c in allowed)
+        if self.char_filter is not None:
+            text = text.translate(self.char_filter)
         
         # Convert to uppercase
         text = text.upper()
@@ -121,8 +261,7 @@ class TextRecognizer:
     
     def validate_wagon_id(self, text: str) -> bool:
         """Check if text matches wagon ID pattern"""
-        pattern = re.compile(self.wagon_pattern)
-        return bool(pattern.match(text))
+        return bool(self.wagon_re.match(text))
     
     def recognize(self, image: np.ndarray, detections: List[dict]) -> List[dict]:
         """
@@ -135,11 +274,44 @@ class TextRecognizer:
         Returns:
             List of recognition results
         """
-        results = []
+        return self.recognize_batch([(image, detections)])[0]
+    
+    def recognize_batch(self, items: List[Tuple[np.ndarray, List[dict]]]) -> List[List[dict]]:
+        """
+        Recognize detected text regions of several images in one batch
+        
+        Args:
+            items: (image, detections) pairs
+            
+        Returns:
+            List of recognition results per image
+        """
+        rec_batches = self.recognize_regions_batch(
+            [
+                (image, [det.get('aabb', det['box']) for det in detections])
+                for image, detections in items
+            ]
+        )
         
-        for det in detections:
+        return [
+            self.build_results(detections, rec_results)
+            for (_, detections), rec_results in zip(items, rec_batches)
+        ]
+    
+    def build_results(self, detections: List[dict], rec_results: List[Dict]) -> List[dict]:
+        """
+        Postprocess and validate raw recognizer output per detection
+        
+        Args:
+            detections: Text detections (same order as rec_results)
+            rec_results: Raw {'text', 'confidence', 'method'} dicts
+            
+        Returns:
+            List of recognition results
+        """
+        results = []
+        for det, rec_result in zip(detections, rec_results):
             box = det['box']
-            rec_result = self.recognize_region(image, box)
             
             # Postprocess
             text = self.postprocess_text(rec_result['text'])
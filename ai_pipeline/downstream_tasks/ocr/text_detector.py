@@ -5,10 +5,12 @@ Uses PaddleOCR detection model
 
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Any
 import yaml
 from pathlib import Path
 
+from ai_pipeline.downstream_tasks.ocr.paddle_runtime import create_paddle_ocr
+
 try:
     from paddleocr import PaddleOCR
     PADDLE_AVAILABLE = True
@@ -20,8 +22,15 @@ except ImportError:
 class TextDetector:
     """Detect text regions in images"""
     
-    def __init__(self, config_path: str = "ai_pipeline/configs/ocr.yaml"):
-        """Initialize text detector"""
+    def __init__(self, config_path: str = "ai_pipeline/configs/ocr.yaml", paddle_ocr: Optional[Any] = None):
+        """
+        Initialize text detector
+        
+        Args:
+            config_path: OCR config
+            paddle_ocr: Shared PaddleOCR instance (see create_paddle_ocr);
+                the cached one for this config is used when not given
+        """
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
         
@@ -29,20 +38,17 @@ class TextDetector:
         self.use_paddle = PADDLE_AVAILABLE and self.det_config.get('model') == 'paddleocr'
         
         if self.use_paddle:
-            # Initialize PaddleOCR detector
-            self.paddle_ocr = PaddleOCR(
-                use_angle_cls=False,
-                lang='en',
-                det=True,
-                rec=False,
-                show_log=False
-            )
+            # Initialize PaddleOCR detector (shared with the recognizer)
+            self.paddle_ocr = paddle_ocr if paddle_ocr is not None else create_paddle_ocr(self.config)
             print("✓ PaddleOCR detector initialized")
         else:
             print("ℹ Using classical text detection methods")
         
         self.score_threshold = self.det_config.get('score_threshold', 0.5)
         
+        # Run the classical filters on UMat (transparent OpenCL) when a device exists
+        self.use_opencl = cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+        
     def detect_paddle(self, image: np.ndarray) -> List[np.ndarray]:
         """Detect text using PaddleOCR"""
         result = self.paddle_ocr.ocr(image, det=True, rec=False, cls=False)
@@ -63,8 +69,10 @@ class TextDetector:
         Detect text regions using classical CV methods
         Fallback when PaddleOCR not available
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Convert to grayscale (uploaded once; the filters below then stay
+        # on the OpenCL device)
+        src = cv2.UMat(image) if self.use_opencl else image
+        gray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
         
         # Apply adaptive thresholding
         binary = cv2.adaptiveThreshold(
@@ -76,33 +84,30 @@ class TextDetector:
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3))
         dilated = cv2.dilate(binary, kernel, iterations=1)
         
-        # Find contours
-        contours, _ = cv2.findContours(
-            dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-        )
+        # Download only the final mask
+        if isinstance(dilated, cv2.UMat):
+            dilated = dilated.get()
+        
+        # Bounding boxes of all connected regions as one stats array
+        # (row 0 is the background)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(dilated, connectivity=8)
         
-        # Filter contours by aspect ratio and area
+        # Filter regions by aspect ratio and area, vectorized
         h, w = image.shape[:2]
         min_area = (h * w) * 0.001  # At least 0.1% of image
-        boxes = []
         
-        for contour in contours:
-            x, y, cw, ch = cv2.boundingRect(contour)
-            area = cw * ch
-            aspect_ratio = cw / (ch + 1e-6)
-            
-            # Filter: reasonable size and horizontal aspect
-            if area > min_area and 2 < aspect_ratio < 20:
-                # Convert to 4-point format
-                box = np.array([
-                    [x, y],
-                    [x + cw, y],
-                    [x + cw, y + ch],
-                    [x, y + ch]
-                ], dtype=np.float32)
-                boxes.append(box)
+        x, y, cw, ch = stats[1:, :4].astype(np.float64).T
+        area = cw * ch
+        aspect_ratio = cw / (ch + 1e-6)
         
-        return boxes
+        # Filter: reasonable size and horizontal aspect
+        keep = (area > min_area) & (aspect_ratio > 2) & (aspect_ratio < 20)
+        x, y, x2, y2 = x[keep], y[keep], (x + cw)[keep], (y + ch)[keep]
+        
+        # Convert to 4-point format
+        boxes = np.stack([x, y, x2, y, x2, y2, x, y2], axis=1).astype(np.float32).reshape(-1, 4, 2)
+        
+        return list(boxes)
     
     def detect(self, image: np.ndarray) -> List[dict]:
         """
@@ -119,12 +124,32 @@ class TextDetector:
         else:
             boxes = self.detect_classical(image)
         
+        return self.to_detections(boxes, image.shape[:2])
+    
+    @staticmethod
+    def to_detections(boxes: List[np.ndarray], image_shape: Tuple[int, int]) -> List[dict]:
+        """
+        Wrap boxes in the standard detection dict format
+        
+        Each detection also carries 'aabb', its axis-aligned (x0, y0, x1, y1)
+        bounds clipped to the image as Python ints, computed for all boxes
+        at once so recognition can slice crops directly.
+        """
+        if not boxes:
+            return []
+        
+        h, w = image_shape
+        corners = np.stack(boxes).astype(np.int32)
+        aabb = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+        np.clip(aabb, 0, (w, h, w, h), out=aabb)
+        
         # Convert to standard format
         detections = []
-        for i, box in enumerate(boxes):
+        for i, (box, bounds) in enumerate(zip(boxes, aabb.tolist())):
             detections.append({
                 'id': i,
                 'box': box,
+                'aabb': tuple(bounds),
                 'score': 1.0  # Confidence score (1.0 for classical)
             })
         
@@ -7,6 +7,8 @@ import numpy as np
 from typing import List, Dict
 from collections import defaultdict
 
+from ai_pipeline.utils.box_matching import iou_matrix, match_boxes
+
 
 class WagonTracker:
     """Track wagons across video frames"""
@@ -23,9 +25,42 @@ class WagonTracker:
         self.max_age = max_age
         
         self.next_id = 0
-        self.tracks = {}  # track_id -> track_info
         self.total_count = 0
         
+        # Track state as parallel arrays (struct of arrays); rows [0, _n)
+        # are live. Capacity grows in powers of two.
+        self._n = 0
+        self._bbox = np.zeros((16, 4), dtype=np.float32)
+        self._age = np.zeros(16, dtype=np.int32)
+        self._conf = np.zeros(16, dtype=np.float32)
+        self._id = np.zeros(16, dtype=np.int64)
+    
+    @property
+    def tracks(self) -> Dict[int, Dict]:
+        """Live tracks as track_id -> track_info (a snapshot, for inspection)"""
+        n = self._n
+        return {
+            int(track_id): {'bbox': bbox.tolist(), 'age': int(age), 'confidence': float(conf)}
+            for track_id, bbox, age, conf in zip(
+                self._id[:n], self._bbox[:n], self._age[:n], self._conf[:n]
+            )
+        }
+    
+    def _reserve(self, size: int):
+        """Grow the state arrays to hold at least `size` tracks"""
+        capacity = len(self._id)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        
+        n = self._n
+        for name in ('_bbox', '_age', '_conf', '_id'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+        
     def compute_iou(self, box1: List[int], box2: List[int]) -> float:
         """Compute IoU between two boxes"""
         x1_min, y1_min, x1_max, y1_max = box1
@@ -59,65 +94,60 @@ class WagonTracker:
         Returns:
             List of tracked objects with IDs
         """
+        n = self._n
+        num_dets = len(detections)
+        det_boxes = np.array([det['bbox'] for det in detections], dtype=np.float32).reshape(-1, 4)
+        det_conf = np.array([det['confidence'] for det in detections], dtype=np.float32)
+        
         # Match detections to existing tracks
-        matched_tracks = set()
+        rows, cols = match_boxes(iou_matrix(det_boxes, self._bbox[:n]), self.iou_threshold)
+        
+        # Update matched tracks, age the rest
+        unmatched = np.ones(n, dtype=bool)
+        unmatched[cols] = False
+        self._age[:n][unmatched] += 1
+        self._bbox[cols] = det_boxes[rows]
+        self._age[cols] = 0
+        self._conf[cols] = det_conf[rows]
+        
+        # Create new tracks for unmatched detections (in detection order)
+        is_new = np.ones(num_dets, dtype=bool)
+        is_new[rows] = False
+        new_dets = np.flatnonzero(is_new)
+        k = len(new_dets)
+        
+        self._reserve(n + k)
+        new_ids = np.arange(self.next_id, self.next_id + k)
+        self._bbox[n:n + k] = det_boxes[new_dets]
+        self._age[n:n + k] = 0
+        self._conf[n:n + k] = det_conf[new_dets]
+        self._id[n:n + k] = new_ids
+        self._n = n + k
+        self.next_id += k
+        self.total_count += k
+        
+        track_ids = np.empty(num_dets, dtype=np.int64)
+        track_ids[rows] = self._id[cols]
+        track_ids[new_dets] = new_ids
+        
         tracked_objects = []
+        for det, track_id, new in zip(detections, track_ids.tolist(), is_new.tolist()):
+            obj = {
+                'track_id': track_id,
+                'bbox': det['bbox'],
+                'confidence': det['confidence']
+            }
+            if new:
+                obj['new'] = True
+            tracked_objects.append(obj)
         
-        for det in detections:
-            det_box = det['bbox']
-            best_iou = 0.0
-            best_track_id = None
-            
-            # Find best matching track
-            for track_id, track in self.tracks.items():
-                iou = self.compute_iou(det_box, track['bbox'])
-                if iou > best_iou and iou > self.iou_threshold:
-                    best_iou = iou
-                    best_track_id = track_id
-            
-            if best_track_id is not None:
-                # Update existing track
-                self.tracks[best_track_id]['bbox'] = det_box
-                self.tracks[best_track_id]['age'] = 0
-                self.tracks[best_track_id]['confidence'] = det['confidence']
-                matched_tracks.add(best_track_id)
-                
-                tracked_objects.append({
-                    'track_id': best_track_id,
-                    'bbox': det_box,
-                    'confidence': det['confidence']
-                })
-            else:
-                # Create new track
-                track_id = self.next_id
-                self.next_id += 1
-                self.total_count += 1
-                
-                self.tracks[track_id] = {
-                    'bbox': det_box,
-                    'age': 0,
-                    'confidence': det['confidence'],
-                    'first_seen': True
-                }
-                
-                tracked_objects.append({
-                    'track_id': track_id,
-                    'bbox': det_box,
-                    'confidence': det['confidence'],
-                    'new': True
-                })
-        
-        # Age unmatched tracks
-        tracks_to_remove = []
-        for track_id in self.tracks:
-            if track_id not in matched_tracks:
-                self.tracks[track_id]['age'] += 1
-                if self.tracks[track_id]['age'] > self.max_age:
-                    tracks_to_remove.append(track_id)
-        
-        # Remove old tracks
-        for track_id in tracks_to_remove:
-            del self.tracks[track_id]
+        # Remove old tracks (compact the live rows)
+        keep = self._age[:self._n] <= self.max_age
+        if not keep.all():
+            live = int(keep.sum())
+            for arr in (self._bbox, self._age, self._conf, self._id):
+                arr[:live] = arr[:self._n][keep]
+            self._n = live
         
         return tracked_objects
     
@@ -127,7 +157,7 @@ class WagonTracker:
     
     def reset(self):
         """Reset tracker"""
-        self.tracks.clear()
+        self._n = 0
         self.total_count = 0
         self.next_id = 0
 
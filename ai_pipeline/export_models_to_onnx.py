@@ -6,12 +6,15 @@ Author: Team Member 2 (CV & Motion Blur Specialist)
 Purpose: Enable edge deployment via TensorRT optimization
 """
 
+import gc
+import hashlib
+import json
 import os
 import sys
 import torch
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 # Only import ultralytics if YOLO is being used
 try:
@@ -21,17 +24,233 @@ except ImportError:
     YOLO_AVAILABLE = False
     print("WARNING: ultralytics not available. YOLO export skipped.")
 
+try:
+    import onnx
+    import onnxslim
+    ONNXSLIM_AVAILABLE = True
+except ImportError:
+    ONNXSLIM_AVAILABLE = False
+
+def default_damage_classifier() -> torch.nn.Module:
+    """ResNet50 with a 3-class head (no_damage, minor, severe)"""
+    from torchvision.models import resnet50
+    return resnet50(weights=None, num_classes=3)
+
+
+# ONNX Runtime I/O binding example written next to each exported model.
+# Inputs are bound straight from CUDA memory and outputs stay on the device,
+# so no host round trip happens per inference.
+ORT_SNIPPET_TEMPLATE = '''"""
+ONNX Runtime I/O binding for {onnx_name} (generated by export_models_to_onnx.py)
+"""
+
+import numpy as np
+import onnxruntime as ort
+import torch
+
+session = ort.InferenceSession(
+    "{onnx_path}",
+    providers=["CUDAExecutionProvider", "CPUExecutionProvider"]
+)
+
+
+def infer(batch: torch.Tensor):
+    """Run a CUDA tensor batch {input_shape} ({dtype}); returns an OrtValue on the GPU"""
+    batch = batch.contiguous()
+    binding = session.io_binding()
+    binding.bind_input(
+        name="{input_name}",
+        device_type="cuda",
+        device_id=batch.device.index or 0,
+        element_type=np.{dtype},
+        shape=tuple(batch.shape),
+        buffer_ptr=batch.data_ptr()
+    )
+    # Let ORT allocate the output on the device (no copy back to host)
+    binding.bind_output("{output_name}", "cuda")
+    session.run_with_iobinding(binding)
+    return binding.get_outputs()[0]
+
+
+if __name__ == "__main__":
+    dummy = torch.zeros({example_shape}, dtype=torch.{dtype}, device="cuda")
+    print(infer(dummy).shape())
+'''
+
+
 class ONNXExporter:
     """
     Utility class to export models to ONNX format
-    Opset 13 ensures TensorRT 8.0+ compatibility
+    Opset 17 (TensorRT 8.5+) so FP16 / Q-DQ graphs fold cleanly
     """
     
-    def __init__(self, output_dir: str = "ai_pipeline/models"):
+    def __init__(
+        self,
+        output_dir: str = "ai_pipeline/models",
+        opset: int = 17,
+        calibration_dir: str = "data/calibration",
+        opt_batch: int = 8,
+        max_batch: int = 16
+    ):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.opset = opset
+        # Batch axis is dynamic so one engine serves 1..max_batch cameras;
+        # TensorRT tunes kernels for opt_batch
+        self.opt_batch = opt_batch
+        self.max_batch = max_batch
+        self.calibration_dir = calibration_dir  # Representative frames for INT8 calibration
         self.export_results = {}
     
+    def slim_onnx(self, onnx_path: Path) -> float:
+        """
+        Simplify an exported graph in place with onnxslim
+        
+        Args:
+            onnx_path: Exported .onnx file
+        
+        Returns:
+            Size reduction in MB (0.0 if onnxslim is not installed)
+        """
+        if not ONNXSLIM_AVAILABLE:
+            return 0.0
+        
+        size_before = os.path.getsize(onnx_path)
+        onnx.save(onnxslim.slim(onnx.load(str(onnx_path))), str(onnx_path))
+        return round((size_before - os.path.getsize(onnx_path)) / (1024**2), 2)
+    
+    def generate_onnxruntime_snippet(
+        self,
+        onnx_path: Path,
+        input_name: str,
+        output_name: str,
+        input_shape: Tuple,
+        dtype: str = "float32"
+    ) -> str:
+        """
+        Write an ONNX Runtime I/O binding example next to the ONNX file
+        
+        Args:
+            onnx_path: Exported .onnx file
+            input_name: Graph input name
+            output_name: Graph output name
+            input_shape: Input shape ("batch" for the dynamic axis)
+            dtype: Input element type (numpy / torch name)
+        
+        Returns:
+            Path of the generated .py file
+        """
+        onnx_path = Path(onnx_path)
+        snippet_path = onnx_path.with_name(f"{onnx_path.stem}_ort_iobinding.py")
+        example_shape = tuple(self.opt_batch if d == "batch" else d for d in input_shape)
+        
+        snippet_path.write_text(ORT_SNIPPET_TEMPLATE.format(
+            onnx_name=onnx_path.name,
+            onnx_path=onnx_path.as_posix(),
+            input_name=input_name,
+            output_name=output_name,
+            input_shape=tuple(input_shape),
+            example_shape=example_shape,
+            dtype=dtype
+        ))
+        return str(snippet_path)
+    
+    @staticmethod
+    def _source_fingerprint(path: str) -> List:
+        """(mtime_ns, size, sha256 of the first MB) of a model file"""
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            head_digest = hashlib.sha256(f.read(1024**2)).hexdigest()
+        return [stat.st_mtime_ns, stat.st_size, head_digest]
+    
+    def _export_settings(self, export_fn: Callable, args: Tuple, kwargs: Dict) -> str:
+        """Stable description of everything besides the source that shapes the output"""
+        def describe(value):
+            if callable(value):
+                return f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', repr(value))}"
+            return repr(value)
+        
+        parts = [export_fn.__name__, str(self.opset), str(self.opt_batch), str(self.max_batch)]
+        parts += [describe(arg) for arg in args]
+        parts += [f"{key}={describe(value)}" for key, value in sorted(kwargs.items())]
+        return "|".join(parts)
+    
+    def _cached_export(
+        self,
+        output_path: Path,
+        source_path: str,
+        export_fn: Callable[..., Dict],
+        *args,
+        force: bool = False,
+        **kwargs
+    ) -> Dict:
+        """
+        Run an export unless its output is up to date with the source model
+        
+        A sidecar <output>.meta.json records the source fingerprint, the
+        export settings and the export result. When both match and the
+        output still exists, the recorded result is returned with status
+        "cached" instead of exporting again.
+        
+        Args:
+            output_path: File the export writes
+            source_path: Source model file (.pt)
+            export_fn: Export method, called as export_fn(*args, **kwargs)
+            force: Export even if the output is up to date
+        
+        Returns:
+            Export result
+        """
+        output_path = Path(output_path)
+        meta_path = output_path.with_suffix(".meta.json")
+        settings = self._export_settings(export_fn, args, kwargs)
+        
+        try:
+            fingerprint = self._source_fingerprint(source_path)
+        except OSError:
+            fingerprint = None
+        
+        if not force and fingerprint is not None and output_path.exists() and meta_path.exists():
+            try:
+                with open(meta_path, "r") as f:
+                    meta = json.load(f)
+                if meta.get("source") == fingerprint and meta.get("settings") == settings:
+                    print(f"[Export Cache] {output_path.name} is up to date, skipping export")
+                    return dict(meta["result"], status="cached")
+            except (OSError, ValueError, KeyError):
+                pass  # Unreadable sidecar: export again
+        
+        result = self._run_export(export_fn, *args, **kwargs)
+        
+        if result.get("status") == "success" and fingerprint is not None:
+            with open(meta_path, "w") as f:
+                json.dump({"source": fingerprint, "settings": settings, "result": result}, f, indent=2)
+        return result
+    
+    def _run_export(self, export_fn: Callable[..., Dict], *args, **kwargs) -> Dict:
+        """
+        Run one export and release its memory before the next one
+        
+        Sequential exports (and the TensorRT build after them) can otherwise
+        run out of memory on a 16 GB Jetson because caches from the previous
+        export are still held.
+        """
+        use_cuda = torch.cuda.is_available()
+        if use_cuda:
+            torch.cuda.reset_peak_memory_stats()
+        
+        try:
+            result = export_fn(*args, **kwargs)
+        finally:
+            gc.collect()
+            if use_cuda:
+                torch.cuda.empty_cache()
+        
+        if use_cuda:
+            result["peak_cuda_mb"] = round(torch.cuda.max_memory_allocated() / (1024**2), 1)
+            print(f"  Peak CUDA memory: {result['peak_cuda_mb']} MB")
+        return result
+    
     def export_yolo_detector(self, model_path: str, export_name: str = "yolov8m") -> Dict:
         """
         Export YOLOv8 wagon detector to ONNX
@@ -49,28 +268,46 @@ class ONNXExporter:
         try:
             print(f"\n[YOLO Export] Loading model from {model_path}...")
             model = YOLO(model_path)
+            # NHWC weights, like the PyTorch inference paths
+            model.model = model.model.to(memory_format=torch.channels_last)
             
             output_path = self.output_dir / f"{export_name}.onnx"
             
-            print(f"[YOLO Export] Exporting to ONNX (opset=13, simplify=True)...")
+            # FP16 export needs a CUDA device (ultralytics traces on GPU)
+            half = torch.cuda.is_available()
+            precision = "fp16" if half else "fp32"
+            
+            print(f"[YOLO Export] Exporting to ONNX (opset={self.opset}, {precision})...")
             model.export(
                 format='onnx',
-                opset=13,
-                simplify=True,
-                dynamic=False,  # Static shape for Jetson
+                opset=self.opset,
+                half=half,
+                device=0 if half else 'cpu',  # CPU export drops half (and rejects it with dynamic)
+                simplify=not ONNXSLIM_AVAILABLE,  # onnxslim pass below otherwise
+                dynamic=True,  # Dynamic batch (fixed by the TensorRT profile below)
                 imgsz=640
             )
             
             # Verify export
             if os.path.exists(output_path):
+                slim_delta_mb = self.slim_onnx(output_path)
                 file_size_mb = os.path.getsize(output_path) / (1024**2)
                 result = {
                     "status": "success",
                     "output_file": str(output_path),
                     "file_size_mb": round(file_size_mb, 2),
                     "model_type": "YOLOv8 Wagon Detector",
-                    "opset": 13,
-                    "input_shape": (1, 3, 640, 640),
+                    "opset": self.opset,
+                    "precision": precision,
+                    "input_name": "images",
+                    "input_shape": ("batch", 3, 640, 640),
+                    "opt_batch": self.opt_batch,
+                    "max_batch": self.max_batch,
+                    "slim_delta_mb": slim_delta_mb,
+                    "runtime_snippet": self.generate_onnxruntime_snippet(
+                        output_path, "images", "output0", ("batch", 3, 640, 640),
+                        dtype="float16" if half else "float32"
+                    ),
                     "output_type": "Detections + Confidence"
                 }
                 print(f"[YOLO Export] SUCCESS: {output_path} ({file_size_mb:.2f} MB)")
@@ -82,49 +319,165 @@ class ONNXExporter:
             print(f"[YOLO Export] ERROR: {str(e)}")
             return {"status": "failed", "reason": str(e)}
     
-    def export_damage_classifier(self, model_path: str, export_name: str = "damage_classifier") -> Dict:
+    def export_yolo_engine(self, model_path: str, int8: bool = False, workspace_gb: int = 4) -> Dict:
+        """
+        Build the YOLOv8 TensorRT engine directly with Ultralytics
+        
+        Skips the ONNX -> trtexec round trip and guarantees the engine is
+        actually FP16 (or INT8). Engines are device-specific, so this must
+        run on the Jetson itself.
+        
+        Args:
+            model_path: Path to .pt model file
+            int8: Build INT8 (calibrated on images under calibration_dir)
+            workspace_gb: TensorRT builder workspace in GB
+        
+        Returns:
+            Dictionary with export status and specs
+        """
+        if not YOLO_AVAILABLE:
+            return {"status": "skipped", "reason": "ultralytics not installed"}
+        if not torch.cuda.is_available():
+            return {"status": "skipped", "reason": "TensorRT engines must be built on a CUDA device"}
+        
+        try:
+            print(f"\n[YOLO Engine] Loading model from {model_path}...")
+            model = YOLO(model_path)
+            
+            precision = "int8" if int8 else "fp16"
+            print(f"[YOLO Engine] Building TensorRT engine ({precision}, batch 1..{self.max_batch})...")
+            export_kwargs = dict(
+                format='engine',
+                half=True,
+                int8=int8,
+                dynamic=True,
+                batch=self.max_batch,
+                workspace=workspace_gb,
+                simplify=True,
+                imgsz=640,
+                device=0
+            )
+            if int8:
+                export_kwargs['data'] = self.calibration_dir
+            output_path = model.export(**export_kwargs)
+            
+            if output_path and os.path.exists(output_path):
+                file_size_mb = os.path.getsize(output_path) / (1024**2)
+                result = {
+                    "status": "success",
+                    "format": "engine",
+                    "output_file": str(output_path),
+                    "file_size_mb": round(file_size_mb, 2),
+                    "model_type": "YOLOv8 Wagon Detector (TensorRT)",
+                    "precision": precision,
+                    "input_name": "images",
+                    "input_shape": ("batch", 3, 640, 640),
+                    "opt_batch": max(1, self.max_batch // 2),  # Ultralytics' profile
+                    "max_batch": self.max_batch
+                }
+                print(f"[YOLO Engine] SUCCESS: {output_path} ({file_size_mb:.2f} MB)")
+                return result
+            else:
+                return {"status": "failed", "reason": "Engine file not created"}
+        
+        except Exception as e:
+            print(f"[YOLO Engine] ERROR: {str(e)}")
+            return {"status": "failed", "reason": str(e)}
+    
+    def export_damage_classifier(
+        self,
+        model_path: str,
+        arch: Callable[[], torch.nn.Module] = default_damage_classifier,
+        export_name: str = "damage_classifier",
+        dynamic_batch: bool = True,
+        half: bool = False
+    ) -> Dict:
         """
         Export PyTorch damage classifier to ONNX
         Typical: ResNet50 or EfficientNet backbone
         
         Args:
-            model_path: Path to .pt model file
+            model_path: Path to the state_dict checkpoint (.pt / .pth)
+            arch: Factory building the (untrained) classifier architecture
             export_name: Output ONNX filename
+            dynamic_batch: Export the batch axis as dynamic (only that axis;
+                spatial size stays fixed for TensorRT / ORT I/O binding)
+            half: Export FP16 weights and input (traced on CUDA; ignored
+                without a GPU)
         
         Returns:
             Dictionary with export status and specs
         """
         try:
             print(f"\n[Damage Classifier Export] Loading model from {model_path}...")
-            model = torch.load(model_path, map_location='cpu')
+            # Weights only: no pickled code, and a plain nn.Module to trace
+            model = arch()
+            checkpoint = torch.load(model_path, map_location='cpu', weights_only=True)
+            model.load_state_dict(checkpoint.get("model_state_dict", checkpoint))
             model.eval()
             
-            # Create dummy input (batch_size=1, channels=3, height=224, width=224)
+            # Create dummy input (batch_size=1, channels=3, height=224, width=224);
+            # the batch axis is exported as dynamic
             dummy_input = torch.randn(1, 3, 224, 224)
             
+            # FP16 graph (half the file size and weight bandwidth); CPU half
+            # convolutions are not supported everywhere, so trace on the GPU
+            half = half and torch.cuda.is_available()
+            precision = "fp16" if half else "fp32"
+            if half:
+                model = model.cuda().half()
+                dummy_input = dummy_input.cuda().half()
+            
+            # NHWC weights and input, like the PyTorch inference paths
+            model = model.to(memory_format=torch.channels_last)
+            dummy_input = dummy_input.contiguous(memory_format=torch.channels_last)
+            
+            # Trace in eval mode so only the inference graph is exported
+            with torch.no_grad():
+                model = torch.jit.trace(model, dummy_input, strict=False)
+            
             output_path = self.output_dir / f"{export_name}.onnx"
             
-            print(f"[Damage Classifier Export] Exporting to ONNX (opset=13)...")
-            torch.onnx.export(
-                model,
-                dummy_input,
-                str(output_path),
-                opset_version=13,
-                input_names=['image'],
-                output_names=['logits'],
-                dynamic_axes=None,  # Static for Jetson
-                verbose=False
-            )
+            print(f"[Damage Classifier Export] Exporting to ONNX (opset={self.opset}, {precision})...")
+            with torch.no_grad():
+                torch.onnx.export(
+                    model,
+                    dummy_input,
+                    str(output_path),
+                    opset_version=self.opset,
+                    export_params=True,
+                    keep_initializers_as_inputs=False,
+                    do_constant_folding=True,
+                    training=torch.onnx.TrainingMode.EVAL,
+                    input_names=['image'],
+                    output_names=['logits'],
+                    dynamic_axes={'image': {0: 'batch'}, 'logits': {0: 'batch'}} if dynamic_batch else None,
+                    verbose=False
+                )
+            del model, dummy_input
             
             if os.path.exists(output_path):
+                slim_delta_mb = self.slim_onnx(output_path)
                 file_size_mb = os.path.getsize(output_path) / (1024**2)
+                input_shape = ("batch" if dynamic_batch else 1, 3, 224, 224)
+                max_batch = self.max_batch if dynamic_batch else 1
+                opt_batch = self.opt_batch if dynamic_batch else 1
                 result = {
                     "status": "success",
                     "output_file": str(output_path),
                     "file_size_mb": round(file_size_mb, 2),
                     "model_type": "Damage Classifier (ResNet50)",
-                    "opset": 13,
-                    "input_shape": (1, 3, 224, 224),
+                    "opset": self.opset,
+                    "precision": precision,
+                    "input_name": "image",
+                    "input_shape": input_shape,
+                    "opt_batch": opt_batch,
+                    "max_batch": max_batch,
+                    "slim_delta_mb": slim_delta_mb,
+                    "runtime_snippet": self.generate_onnxruntime_snippet(
+                        output_path, "image", "logits", input_shape,
+                        dtype="float16" if half else "float32"
+                    ),
                     "output_classes": 3  # (no_damage, minor, severe)
                 }
                 print(f"[Damage Classifier Export] SUCCESS: {output_path} ({file_size_mb:.2f} MB)")
@@ -141,7 +494,8 @@ class ONNXExporter:
         Export all models based on config
         
         Args:
-            config: Dictionary with paths to model files
+            config: Dictionary with paths to model files ('force_export'
+                re-exports models whose outputs are up to date)
         
         Returns:
             Dictionary mapping model names to export results
@@ -151,19 +505,43 @@ class ONNXExporter:
         print("="*70)
         
         results = {}
+        force = config.get('force_export', False)
         
         # Export YOLO detector
         if 'yolo_model_path' in config:
-            results['yolo_detector'] = self.export_yolo_detector(
+            yolo_export_name = config.get('yolo_export_name', 'yolov8m')
+            results['yolo_detector'] = self._cached_export(
+                self.output_dir / f"{yolo_export_name}.onnx",
+                config['yolo_model_path'],
+                self.export_yolo_detector,
                 config['yolo_model_path'],
-                config.get('yolo_export_name', 'yolov8m')
+                yolo_export_name,
+                force=force
+            )
+        
+        # Build the YOLO TensorRT engine in one step (on the target device)
+        if 'yolo_model_path' in config and config.get('yolo_engine', False):
+            results['yolo_engine'] = self._cached_export(
+                Path(config['yolo_model_path']).with_suffix('.engine'),
+                config['yolo_model_path'],
+                self.export_yolo_engine,
+                config['yolo_model_path'],
+                int8=config.get('yolo_engine_int8', False),
+                force=force
             )
         
         # Export damage classifier
         if 'damage_classifier_path' in config:
-            results['damage_classifier'] = self.export_damage_classifier(
+            damage_export_name = config.get('damage_export_name', 'damage_classifier')
+            results['damage_classifier'] = self._cached_export(
+                self.output_dir / f"{damage_export_name}.onnx",
                 config['damage_classifier_path'],
-                config.get('damage_export_name', 'damage_classifier')
+                self.export_damage_classifier,
+                config['damage_classifier_path'],
+                config.get('damage_classifier_arch', default_damage_classifier),
+                damage_export_name,
+                half=config.get('damage_export_half', False),
+                force=force
             )
         
         print("\n" + "="*70)
@@ -174,11 +552,12 @@ class ONNXExporter:
             status = result.get('status', 'unknown')
             print(f"\n{model_name}:")
             print(f"  Status: {status}")
-            if status == 'success':
+            if status in ('success', 'cached'):
                 print(f"  File: {result['output_file']}")
                 print(f"  Size: {result['file_size_mb']} MB")
                 print(f"  Type: {result.get('model_type', 'N/A')}")
                 print(f"  Input Shape: {result.get('input_shape', 'N/A')}")
+                print(f"  Batch: 1..{result.get('max_batch', 1)} (opt {result.get('opt_batch', 1)})")
             else:
                 print(f"  Reason: {result.get('reason', 'Unknown')}")
         
@@ -189,24 +568,90 @@ class ONNXExporter:
         """
         Generate TensorRT conversion commands for Jetson deployment
         To be run ON the Jetson AGX device
+        
+        Each model gets an FP16 engine and an INT8 variant. The INT8 build
+        reads a calibration cache <model>_calib.cache next to the ONNX file.
+        This script does not create it; it has to be produced separately by
+        entropy calibration over the images in calibration_dir (the printed
+        instructions say so). YOLO uses --best so
+        TensorRT picks the precision per layer; the classifier runs pure INT8.
+        GPU engines get a 1..max_batch optimization profile tuned for opt_batch.
+        
+        The damage classifier additionally gets INT8 engines for both DLA
+        cores (unsupported layers fall back to the GPU), leaving the iGPU to
+        YOLO. DLA needs static shapes, so those engines are fixed at opt_batch.
+        
+        Every build shares one timing cache in output_dir, so tactics timed by
+        an earlier build are reused instead of re-profiled. Each engine also
+        exports its per-layer profile and layer info (precision per layer), to
+        spot layers that silently fall back from FP16/INT8 to FP32.
         """
+        timing_cache = self.output_dir / ".trt_timing.cache"
+        
+        def build_flags(engine: str) -> str:
+            stem = engine[:-len('.engine')]
+            return (
+                f" --timingCacheFile={timing_cache} --profilingVerbosity=detailed "
+                f"--exportProfile={stem}.profile.json --exportLayerInfo={stem}.layers.json"
+            )
+        
         commands = [
             "# Run these commands ON Jetson AGX after deployment",
             "# Requires: trtexec (part of TensorRT)",
+            "# INT8 variants read <model>_calib.cache next to the ONNX file. This script",
+            "# does NOT create it: produce it yourself with INT8 entropy calibration over",
+            f"# the images in {self.calibration_dir} (e.g. a TensorRT IInt8EntropyCalibrator2,",
+            "# as in ai_pipeline/deblurring/export_trt.py), or skip the INT8 commands.",
             ""
         ]
         
         for model_name, result in self.export_results.items():
-            if result.get('status') == 'success':
+            # Engines built directly need no conversion
+            if result.get('status') in ('success', 'cached') and result.get('format') != 'engine':
                 onnx_file = result['output_file']
                 engine_name = onnx_file.replace('.onnx', '.engine')
+                int8_engine_name = onnx_file.replace('.onnx', '_int8.engine')
+                calib_cache = onnx_file.replace('.onnx', '_calib.cache')
+                
+                # Optimization profile for the dynamic batch axis
+                name = result['input_name']
+                chw = "x".join(str(d) for d in result['input_shape'][1:])
+                shapes = (
+                    f"--minShapes={name}:1x{chw} "
+                    f"--optShapes={name}:{result['opt_batch']}x{chw} "
+                    f"--maxShapes={name}:{result['max_batch']}x{chw}"
+                )
                 
                 if 'yolo' in model_name.lower():
-                    cmd = f"trtexec --onnx={onnx_file} --saveEngine={engine_name} --fp16 --workspace=1024"
+                    cmd = (
+                        f"trtexec --onnx={onnx_file} --saveEngine={engine_name} "
+                        f"--fp16 --sparsity=enable --workspace=1024 {shapes}"
+                    )
+                    int8_cmd = (
+                        f"trtexec --onnx={onnx_file} --saveEngine={int8_engine_name} "
+                        f"--best --calib={calib_cache} --workspace=1024 {shapes}"
+                    )
                 else:
-                    cmd = f"trtexec --onnx={onnx_file} --saveEngine={engine_name} --fp16 --workspace=512"
+                    cmd = f"trtexec --onnx={onnx_file} --saveEngine={engine_name} --fp16 --workspace=512 {shapes}"
+                    int8_cmd = (
+                        f"trtexec --onnx={onnx_file} --saveEngine={int8_engine_name} "
+                        f"--int8 --calib={calib_cache} --workspace=512 {shapes}"
+                    )
+                
+                commands.append(cmd + build_flags(engine_name))
+                commands.append(int8_cmd + build_flags(int8_engine_name))
                 
-                commands.append(cmd)
+                if 'damage' in model_name.lower():
+                    static_shape = f"{name}:{result['opt_batch']}x{chw}"
+                    for dla_core in (0, 1):
+                        dla_engine_name = onnx_file.replace('.onnx', f'_dla{dla_core}.engine')
+                        commands.append(
+                            f"trtexec --onnx={onnx_file} --saveEngine={dla_engine_name} "
+                            f"--useDLACore={dla_core} --allowGPUFallback --int8 --fp16 "
+                            f"--calib={calib_cache} --workspace=512 "
+                            f"--minShapes={static_shape} --optShapes={static_shape} "
+                            f"--maxShapes={static_shape}" + build_flags(dla_engine_name)
+                        )
         
         return commands
 
@@ -221,6 +666,7 @@ def main():
     config = {
         # 'yolo_model_path': 'ai_pipeline/models/yolov8m.pt',  # Uncomment if available
         # 'damage_classifier_path': 'ai_pipeline/models/damage_classifier.pt',  # Uncomment if available
+        # 'yolo_engine': True,  # Also build the YOLO TensorRT engine directly (on Jetson)
     }
     
     # Check if actual model files exist and add to config
@@ -4,13 +4,34 @@ Handles reconnection, frame buffering, and error recovery
 Author: Member 1
 """
 
+import asyncio
 import cv2
 import numpy as np
+import os
 import time
 import logging
-from typing import Optional, Tuple, Dict
-from threading import Thread, Lock
+import multiprocessing as mp
 import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from multiprocessing import shared_memory
+from typing import Optional, Tuple, Dict, List, Union
+from threading import Thread, Lock, Condition
+
+try:
+    import torch
+    from torchvision.io import decode_jpeg
+    from torchvision.transforms.functional import resize as tensor_resize
+    NVJPEG_AVAILABLE = torch.cuda.is_available()
+except ImportError:
+    NVJPEG_AVAILABLE = False
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,17 +39,359 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# appsink keeps only the newest decoded frame, so stale frames are dropped
+# inside GStreamer instead of in Python
+APPSINK = "video/x-raw,format=BGR ! appsink max-buffers=1 drop=true sync=false"
+
+
+@lru_cache(maxsize=1)
+def gstreamer_available() -> bool:
+    """Whether this OpenCV build has the GStreamer backend"""
+    for line in cv2.getBuildInformation().splitlines():
+        if line.strip().startswith("GStreamer:"):
+            return "YES" in line
+    return False
+
+
+def build_gstreamer_pipeline(
+    stream_url: str,
+    target_resolution: Optional[Tuple[int, int]] = None
+) -> Optional[str]:
+    """
+    Build a GStreamer capture pipeline for a camera URL
+    
+    MJPEG over HTTP (IP Webcam) is decoded with jpegdec; RTSP H.264 uses
+    NVDEC (nvv4l2decoder) on Jetson and avdec_h264 elsewhere. With a target
+    resolution the frames are scaled inside the pipeline (nvvidconv on
+    Jetson, videoscale otherwise), so only the small frame reaches Python.
+    
+    Args:
+        stream_url: Camera URL
+        target_resolution: Output (width, height), or None for native size
+        
+    Returns:
+        Pipeline string, or None if the URL scheme is not handled
+    """
+    on_jetson = os.path.exists("/etc/nv_tegra_release")
+    size = ""
+    if target_resolution is not None:
+        size = f",width={target_resolution[0]},height={target_resolution[1]}"
+    
+    if on_jetson:
+        # nvvidconv converts (and scales) on the VIC, not the CPU
+        convert = f"nvvidconv ! video/x-raw,format=BGRx{size} ! videoconvert"
+    elif size:
+        convert = f"videoscale ! video/x-raw{size} ! videoconvert"
+    else:
+        convert = "videoconvert"
+    
+    if stream_url.startswith(("http://", "https://")):
+        return (
+            f"souphttpsrc location={stream_url} is-live=true do-timestamp=true ! "
+            f"multipartdemux ! jpegdec ! {convert} ! {APPSINK}"
+        )
+    
+    if stream_url.startswith("rtsp://"):
+        decode = "nvv4l2decoder" if on_jetson else "avdec_h264"
+        return (
+            f"rtspsrc location={stream_url} latency=0 ! rtph264depay ! h264parse ! "
+            f"{decode} ! {convert} ! {APPSINK}"
+        )
+    
+    return None
+
+
+def pop_jpeg(buffer: bytearray) -> Optional[bytes]:
+    """Cut the first complete JPEG (SOI..EOI) out of an MJPEG byte buffer"""
+    start = buffer.find(b"\xff\xd8")
+    end = buffer.find(b"\xff\xd9", start + 2) if start >= 0 else -1
+    if end < 0:
+        return None
+    jpeg = bytes(buffer[start:end + 2])
+    del buffer[:end + 2]
+    return jpeg
+
+
+# libjpeg decodes at 1/8, 1/4 or 1/2 scale in the DCT domain, far cheaper
+# than a full decode followed by cv2.resize
+_REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def reduced_decode_flag(
+    source_shape: Tuple[int, ...],
+    target_resolution: Optional[Tuple[int, int]]
+) -> int:
+    """
+    Pick the cheapest cv2.imdecode flag that still covers the target size
+    
+    Args:
+        source_shape: Shape of a full-resolution decoded frame (h, w, 3)
+        target_resolution: Wanted (width, height), or None for native size
+        
+    Returns:
+        IMREAD_REDUCED_COLOR_8/4/2, or IMREAD_COLOR
+    """
+    if target_resolution is not None:
+        height, width = source_shape[:2]
+        for factor, flag in _REDUCED_DECODE_FLAGS:
+            if width // factor >= target_resolution[0] and height // factor >= target_resolution[1]:
+                return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_jpeg_reduced(
+    jpeg: bytes,
+    flag: Optional[int],
+    target_resolution: Optional[Tuple[int, int]]
+) -> Tuple[Optional[np.ndarray], Optional[int]]:
+    """
+    Decode a JPEG on the CPU with the reduction flag for this stream
+    
+    Args:
+        jpeg: Encoded frame
+        flag: Flag from an earlier frame, or None to decode at full size
+            and pick it from this frame
+        target_resolution: Wanted (width, height), or None for native size
+        
+    Returns:
+        (BGR frame or None, flag for the next frame)
+    """
+    data = np.frombuffer(jpeg, dtype=np.uint8)
+    frame = cv2.imdecode(data, cv2.IMREAD_COLOR if flag is None else flag)
+    if frame is not None and flag is None:
+        flag = reduced_decode_flag(frame.shape, target_resolution)
+    return frame, flag
+
+
+class MJPEGReader:
+    """
+    VideoCapture-like reader for HTTP MJPEG streams with optional GPU decode
+    
+    Raw JPEGs are cut out of the multipart stream by their SOI/EOI markers.
+    With device="cuda" they are decoded by nvJPEG (torchvision decode_jpeg)
+    straight into CUDA tensors (3, H, W) RGB uint8, so the detector needs no
+    host-to-device copy; otherwise (or without CUDA) cv2.imdecode returns BGR
+    numpy frames, decoded at a reduced scale when target_resolution allows.
+    """
+    
+    CHUNK_SIZE = 64 * 1024
+    
+    def __init__(
+        self,
+        stream_url: str,
+        timeout: float = 5.0,
+        device: str = "cuda",
+        target_resolution: Optional[Tuple[int, int]] = None
+    ):
+        import requests
+        
+        self.use_gpu = device == "cuda" and NVJPEG_AVAILABLE
+        if device == "cuda" and not self.use_gpu:
+            logger.warning("nvJPEG decode unavailable, decoding MJPEG on CPU")
+        
+        # CPU decode scale, picked from the first frame
+        self.target_resolution = target_resolution
+        self._decode_flag = None
+        
+        self._buffer = bytearray()
+        try:
+            self._response = requests.get(stream_url, stream=True, timeout=timeout)
+            self._response.raise_for_status()
+            self._chunks = self._response.iter_content(chunk_size=self.CHUNK_SIZE)
+        except Exception as e:
+            logger.error("MJPEG connection to %s failed: %s", stream_url, e)
+            self._response = None
+    
+    def isOpened(self) -> bool:
+        return self._response is not None
+    
+    def _next_jpeg(self) -> Optional[bytes]:
+        """Read until one complete JPEG is buffered and cut it out"""
+        while True:
+            jpeg = pop_jpeg(self._buffer)
+            if jpeg is not None:
+                return jpeg
+            
+            chunk = next(self._chunks, None)
+            if not chunk:
+                return None
+            self._buffer += chunk
+    
+    def read(self) -> Tuple[bool, Optional[Union[np.ndarray, "torch.Tensor"]]]:
+        if self._response is None:
+            return False, None
+        try:
+            jpeg = self._next_jpeg()
+            if jpeg is None:
+                return False, None
+            
+            if self.use_gpu:
+                data = torch.frombuffer(jpeg, dtype=torch.uint8)
+                return True, decode_jpeg(data, device="cuda")
+            
+            frame, self._decode_flag = decode_jpeg_reduced(
+                jpeg, self._decode_flag, self.target_resolution
+            )
+            return frame is not None, frame
+        except Exception as e:
+            logger.debug("MJPEG read error: %s", e)
+            return False, None
+    
+    def release(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+
+class SharedFrameRing:
+    """
+    Ring of shared-memory frame slots for zero-copy handoff to other processes
+    
+    The capture thread copies each frame into a free slot and publishes the
+    slot index; consumers (in this or a child process) acquire the latest
+    slot, read it in place as a numpy view and release it. Slots held by a
+    reader are never overwritten. The ring is picklable, so it can be passed
+    to multiprocessing.Process.
+    """
+    
+    def __init__(self, num_slots: int, shape: Tuple[int, ...], dtype=np.uint8):
+        """
+        Allocate the slots
+        
+        Args:
+            num_slots: Number of frame slots (at least 2)
+            shape: Frame shape, e.g. (h, w, 3)
+            dtype: Frame dtype
+        """
+        self.num_slots = max(num_slots, 2)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shms = [
+            shared_memory.SharedMemory(create=True, size=nbytes)
+            for _ in range(self.num_slots)
+        ]
+        self._owner = True
+        self._make_views()
+        
+        # Shared state; every field is guarded by the refcount array's lock
+        self.refcounts = mp.Array('i', self.num_slots)
+        self.latest = mp.Value('i', -1, lock=False)
+        self.sequence = mp.Value('q', 0, lock=False)
+        self._write_idx = 0
+    
+    def _make_views(self):
+        self.slots = [
+            np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+            for shm in self._shms
+        ]
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['slots']
+        state['_owner'] = False
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._make_views()
+    
+    def write(self, frame: np.ndarray) -> bool:
+        """
+        Copy a frame into a free slot and publish it
+        
+        Returns:
+            False if the frame was dropped (shape mismatch or all slots in use)
+        """
+        if frame.shape != self.shape:
+            return False
+        
+        with self.refcounts.get_lock():
+            latest = self.latest.value
+            for k in range(self.num_slots):
+                idx = (self._write_idx + k) % self.num_slots
+                if self.refcounts[idx] == 0 and idx != latest:
+                    break
+            else:
+                return False
+        
+        # Unpublished and unreferenced, so no reader can touch it meanwhile
+        np.copyto(self.slots[idx], frame)
+        
+        with self.refcounts.get_lock():
+            self.latest.value = idx
+            self.sequence.value += 1
+        self._write_idx = idx + 1
+        return True
+    
+    def acquire(self, after_sequence: int = 0) -> Optional[Tuple[int, int, np.ndarray]]:
+        """
+        Take a reference to the latest frame
+        
+        Args:
+            after_sequence: Only return a frame newer than this sequence number
+            
+        Returns:
+            (slot, sequence, frame view) or None; call release(slot) when done
+        """
+        with self.refcounts.get_lock():
+            idx = self.latest.value
+            sequence = self.sequence.value
+            if idx < 0 or sequence <= after_sequence:
+                return None
+            self.refcounts[idx] += 1
+        return idx, sequence, self.slots[idx]
+    
+    def release(self, slot: int):
+        """Drop a reference taken by acquire()"""
+        with self.refcounts.get_lock():
+            self.refcounts[slot] -= 1
+    
+    def close(self):
+        """Detach from the slots (and free them in the creating process)"""
+        self.slots = []
+        for shm in self._shms:
+            shm.close()
+            if self._owner:
+                shm.unlink()
+        self._shms = []
+
+
+# Process-wide registry of shared streams (stream_url -> CameraStream)
+_STREAMS: Dict[str, "CameraStream"] = {}
+_STREAMS_LOCK = Lock()
+
 
 class CameraStream:
     """Thread-safe camera stream handler with automatic reconnection"""
     
+    # Many streams run side by side; no per-instance __dict__
+    __slots__ = (
+        'camera_id', 'stream_url', 'buffer_size', 'timeout', 'reconnect_attempts',
+        'target_resolution', 'gpu_mjpeg', 'gst_pipeline', '_log_prefix',
+        '_latest_frame', '_frame_ready', 'use_shared_memory', 'frame_ring',
+        'capture', 'is_running', 'thread', 'lock',
+        'frame_count', 'dropped_frames', 'subscriber_dropped_frames',
+        'ring_dropped_frames', 'error_count', 'start_time',
+        '_frame_ts', '_last_ns', '_subscribers', '_decode_flag'
+    )
+    
     def __init__(
         self,
         camera_id: str,
         stream_url: str,
         buffer_size: int = 10,
         timeout: int = 5,
-        reconnect_attempts: int = 3
+        reconnect_attempts: int = 3,
+        use_gstreamer: Optional[bool] = None,
+        use_shared_memory: bool = False,
+        target_resolution: Optional[Tuple[int, int]] = None,
+        decode_device: str = "cpu"
     ):
         """
         Initialize camera stream
@@ -36,18 +399,54 @@ class CameraStream:
         Args:
             camera_id: Unique identifier for camera (e.g., "camera_1")
             stream_url: IP Webcam URL (e.g., "http://192.168.1.101:8080/video")
-            buffer_size: Maximum frames to buffer before dropping old frames
+            buffer_size: Number of shared-memory slots with use_shared_memory;
+                otherwise unused (only the latest frame is held, older unread
+                frames are dropped)
             timeout: Connection timeout in seconds
             reconnect_attempts: Number of reconnection attempts on failure
+            use_gstreamer: Capture through a GStreamer pipeline (native decode,
+                frame dropping in appsink); None = when OpenCV supports it.
+                Falls back to FFmpeg if the pipeline cannot open or read
+            use_shared_memory: Also publish frames to a SharedFrameRing
+                (self.frame_ring) for zero-copy consumers in other processes
+            target_resolution: Deliver frames at this (width, height). With
+                GStreamer the decoder pipeline scales, and HTTP MJPEG decoded
+                here uses libjpeg's reduced 1/2-1/8 decode, so callers should
+                not cv2.resize full-resolution frames themselves
+            decode_device: "cuda" decodes HTTP MJPEG on the GPU (nvJPEG); frames
+                are then CUDA tensors (3, H, W) RGB uint8 instead of BGR arrays
         """
         self.camera_id = camera_id
+        self._log_prefix = f"Camera {camera_id}"  # Built once for every log line
         self.stream_url = stream_url
         self.buffer_size = buffer_size
         self.timeout = timeout
         self.reconnect_attempts = reconnect_attempts
+        self.target_resolution = tuple(target_resolution) if target_resolution else None
         
-        # Thread-safe frame buffer
-        self.frame_buffer = queue.Queue(maxsize=buffer_size)
+        if use_gstreamer is None:
+            use_gstreamer = gstreamer_available()
+        # GPU JPEG decode reads the MJPEG stream itself
+        self.gpu_mjpeg = (
+            decode_device == "cuda" and stream_url.startswith(("http://", "https://"))
+        )
+        if self.gpu_mjpeg and use_shared_memory:
+            logger.warning("%s: shared memory ring disabled for GPU-decoded frames", self._log_prefix)
+            use_shared_memory = False
+        
+        self.gst_pipeline = None
+        if use_gstreamer and not self.gpu_mjpeg:
+            self.gst_pipeline = build_gstreamer_pipeline(stream_url, self.target_resolution)
+        # Reduced-scale JPEG decode for the async path (see run_async)
+        self._decode_flag = None
+        
+        # Single-slot latest frame; consumers only ever want the newest one
+        self._latest_frame = None
+        self._frame_ready = Condition()
+        self.use_shared_memory = use_shared_memory
+        self.frame_ring: Optional[SharedFrameRing] = None
+        # Fan-out: one latest-frame queue per subscriber
+        self._subscribers: Tuple[queue.Queue, ...] = ()
         self.capture = None
         self.is_running = False
         self.thread = None
@@ -56,9 +455,169 @@ class CameraStream:
         # Statistics
         self.frame_count = 0
         self.dropped_frames = 0
+        # Per-channel drops, kept apart so fan-out consumers and the shared
+        # memory ring do not inflate dropped_frames
+        self.subscriber_dropped_frames = 0
+        self.ring_dropped_frames = 0
         self.error_count = 0
         self.start_time = None
-        self.last_frame_time = None
+        # Recent frame timestamps (monotonic ns) for windowed FPS
+        self._frame_ts = deque(maxlen=120)
+        self._last_ns = None
+    
+    @classmethod
+    def get_or_create(cls, camera_id: str, stream_url: str, **kwargs) -> "CameraStream":
+        """
+        Get the shared stream for a URL, creating it on first use
+        
+        Consumers of the same camera (detector, classifier, recorder, ...)
+        then share one connection and decoder and each subscribe() to it.
+        
+        Args:
+            camera_id: Camera identifier (used when the stream is created)
+            stream_url: Camera URL (registry key)
+            **kwargs: Passed to CameraStream when it is created
+            
+        Returns:
+            Shared CameraStream (call start() if it is not running yet)
+        """
+        with _STREAMS_LOCK:
+            stream = _STREAMS.get(stream_url)
+            if stream is None:
+                stream = cls(camera_id, stream_url, **kwargs)
+                _STREAMS[stream_url] = stream
+            return stream
+    
+    def subscribe(self) -> queue.Queue:
+        """
+        Register a consumer
+        
+        Returns:
+            Queue that always holds at most the latest frame for this consumer
+        """
+        subscriber = queue.Queue(maxsize=1)
+        with self._frame_ready:
+            self._subscribers = self._subscribers + (subscriber,)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: queue.Queue):
+        """Remove a consumer registered with subscribe()"""
+        with self._frame_ready:
+            self._subscribers = tuple(q for q in self._subscribers if q is not subscriber)
+    
+    def _publish_to_subscribers(self, frame):
+        """Hand the frame to every subscriber, replacing an unread one"""
+        for subscriber in self._subscribers:
+            try:
+                subscriber.put_nowait(frame)
+            except queue.Full:
+                try:
+                    subscriber.get_nowait()
+                    self.subscriber_dropped_frames += 1
+                except queue.Empty:
+                    pass
+                try:
+                    subscriber.put_nowait(frame)
+                except queue.Full:
+                    pass
+    
+    @property
+    def last_frame_time(self) -> Optional[float]:
+        """Wall-clock time of the last frame"""
+        if self._last_ns is None:
+            return None
+        return time.time() - (time.monotonic_ns() - self._last_ns) / 1e9
+    
+    def _open_capture(self) -> cv2.VideoCapture:
+        """Open the camera, through GStreamer when a pipeline is configured"""
+        if self.gpu_mjpeg:
+            return MJPEGReader(self.stream_url, self.timeout, device="cuda")
+        
+        if self.gst_pipeline is not None:
+            return cv2.VideoCapture(self.gst_pipeline, cv2.CAP_GSTREAMER)
+        
+        if self.target_resolution is not None and self.stream_url.startswith(("http://", "https://")):
+            # Decode MJPEG ourselves at a reduced scale instead of letting
+            # FFmpeg decode full frames that are downscaled right after
+            return MJPEGReader(
+                self.stream_url, self.timeout, device="cpu",
+                target_resolution=self.target_resolution
+            )
+        
+        if self.stream_url.startswith("rtsp://"):
+            # RTSP over TCP: UDP packet loss corrupts frames until the next
+            # I-frame. Read by FFmpeg at open time; an existing value wins.
+            os.environ.setdefault(
+                "OPENCV_FFMPEG_CAPTURE_OPTIONS",
+                "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay"
+            )
+        
+        # Timeouts only apply when given at open time
+        timeout_ms = int(self.timeout * 1000)
+        capture = cv2.VideoCapture(
+            self.stream_url,
+            cv2.CAP_FFMPEG,
+            [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms]
+        )
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize latency
+        return capture
+    
+    def _resize_frame(self, frame):
+        """Scale a decoded frame to the target resolution (if set)"""
+        if self.target_resolution is None:
+            return frame
+        
+        width, height = self.target_resolution
+        if isinstance(frame, np.ndarray):
+            if (frame.shape[1], frame.shape[0]) != self.target_resolution:
+                frame = cv2.resize(frame, self.target_resolution, interpolation=cv2.INTER_AREA)
+        elif tuple(frame.shape[1:]) != (height, width):
+            # GPU-decoded (3, H, W) tensor; resize stays on the device
+            frame = tensor_resize(frame, [height, width], antialias=True)
+        return frame
+    
+    def _read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Read one frame at the target resolution"""
+        ret, frame = self.capture.read()
+        
+        # The GStreamer pipeline already scales; only the fallback resizes here
+        if ret and frame is not None and self.gst_pipeline is None:
+            frame = self._resize_frame(frame)
+        return ret, frame
+    
+    def _decode_jpeg(self, jpeg: bytes):
+        """Decode one JPEG at the target resolution (runs in the decoder pool)"""
+        if self.gpu_mjpeg and NVJPEG_AVAILABLE:
+            frame = decode_jpeg(torch.frombuffer(jpeg, dtype=torch.uint8), device="cuda")
+        else:
+            frame, self._decode_flag = decode_jpeg_reduced(
+                jpeg, self._decode_flag, self.target_resolution
+            )
+            if frame is None:
+                return None
+        return self._resize_frame(frame)
+    
+    def _publish_frame(self, frame):
+        """Record a captured frame and hand it to all consumers"""
+        self.frame_count += 1
+        self._last_ns = time.monotonic_ns()
+        self._frame_ts.append(self._last_ns)
+        
+        # Zero-copy consumers read from shared memory
+        if self.frame_ring is not None and not self.frame_ring.write(frame):
+            self.ring_dropped_frames += 1
+        
+        # Publish frame, replacing an unread older one. Fan-out consumers
+        # never read the latest slot, so it only counts as a drop when
+        # nobody has subscribed
+        with self._frame_ready:
+            if self._latest_frame is not None and not self._subscribers:
+                self.dropped_frames += 1
+            self._latest_frame = frame
+            self._frame_ready.notify()
+        
+        # Shared by reference; consumers must not modify frames in place
+        self._publish_to_subscribers(frame)
         
     def start(self) -> bool:
         """
@@ -68,56 +627,106 @@ class CameraStream:
             bool: True if camera started successfully, False otherwise
         """
         if self.is_running:
-            logger.warning(f"Camera {self.camera_id} already running")
+            logger.warning("%s already running", self._log_prefix)
             return True
             
-        logger.info(f"Starting camera {self.camera_id} from {self.stream_url}")
+        logger.info("Starting %s from %s", self._log_prefix, self.stream_url)
         
         # Attempt initial connection
         for attempt in range(self.reconnect_attempts):
-            try:
-                self.capture = cv2.VideoCapture(self.stream_url)
-                self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize latency
+            test_frame = self._connect()
+            if test_frame is None and self._fall_back_to_ffmpeg():
+                test_frame = self._connect()
+            
+            if test_frame is not None:
+                # Frame shape is known now, so the ring can be sized
+                if self.use_shared_memory and self.frame_ring is None:
+                    self.frame_ring = SharedFrameRing(self.buffer_size, test_frame.shape)
                 
-                if self.capture.isOpened():
-                    # Test read
-                    ret, test_frame = self.capture.read()
-                    if ret and test_frame is not None:
-                        self.is_running = True
-                        self.start_time = time.time()
-                        self.last_frame_time = self.start_time
-                        
-                        # Start capture thread
-                        self.thread = Thread(target=self._capture_loop, daemon=True)
-                        self.thread.start()
-                        
-                        logger.info(
-                            f"✓ Camera {self.camera_id} started successfully "
-                            f"(Resolution: {test_frame.shape[1]}x{test_frame.shape[0]})"
-                        )
-                        return True
-                    else:
-                        logger.warning(f"Camera {self.camera_id} opened but cannot read frames")
-                        
-            except Exception as e:
-                logger.error(f"Camera {self.camera_id} connection error: {e}")
+                self.is_running = True
+                self.start_time = time.time()
+                self._last_ns = time.monotonic_ns()
+                
+                # Start capture thread
+                self.thread = Thread(target=self._capture_loop, daemon=True)
+                self.thread.start()
+                
+                # (H, W, 3) arrays or (3, H, W) GPU-decoded tensors
+                if isinstance(test_frame, np.ndarray):
+                    height, width = test_frame.shape[:2]
+                else:
+                    height, width = test_frame.shape[-2:]
+                logger.info(
+                    "✓ %s started successfully (Resolution: %dx%d)",
+                    self._log_prefix, width, height
+                )
+                return True
             
             logger.warning(
-                f"Camera {self.camera_id} connection attempt {attempt + 1}/{self.reconnect_attempts} failed"
+                "%s connection attempt %d/%d failed",
+                self._log_prefix, attempt + 1, self.reconnect_attempts
             )
             time.sleep(2)
         
-        logger.error(f"✗ Failed to connect to camera {self.camera_id} after {self.reconnect_attempts} attempts")
+        logger.error(
+            "✗ Failed to connect to %s after %d attempts", self._log_prefix, self.reconnect_attempts
+        )
         return False
     
+    def _connect(self):
+        """
+        Open the capture and read a test frame
+        
+        Returns:
+            The test frame, or None (capture released) if the camera could
+            not be opened or read
+        """
+        try:
+            self.capture = self._open_capture()
+            
+            if self.capture.isOpened():
+                ret, test_frame = self._read_frame()
+                if ret and test_frame is not None:
+                    return test_frame
+                logger.warning("%s opened but cannot read frames", self._log_prefix)
+        except Exception as e:
+            logger.error("%s connection error: %s", self._log_prefix, e)
+        
+        if self.capture is not None:
+            try:
+                self.capture.release()
+            except Exception:
+                pass
+        return None
+    
+    def _fall_back_to_ffmpeg(self) -> bool:
+        """
+        Drop the GStreamer pipeline after a failed connection
+        
+        The pipeline hardcodes its elements (e.g. the H.264 depayloader or
+        nvv4l2decoder), so cameras it cannot handle open through FFmpeg,
+        which probes the stream, instead.
+        
+        Returns:
+            True if a pipeline was dropped (worth retrying right away)
+        """
+        if self.gst_pipeline is None:
+            return False
+        logger.warning("%s: GStreamer pipeline failed, falling back to FFmpeg", self._log_prefix)
+        self.gst_pipeline = None
+        return True
+    
     def _capture_loop(self):
         """Main capture loop running in separate thread"""
         consecutive_failures = 0
         max_consecutive_failures = 10
+        # Bound once instead of looked up per frame
+        read_frame = self._read_frame
+        publish_frame = self._publish_frame
         
         while self.is_running:
             try:
-                ret, frame = self.capture.read()
+                ret, frame = read_frame()
                 
                 if not ret or frame is None:
                     consecutive_failures += 1
@@ -125,7 +734,8 @@ class CameraStream:
                     
                     if consecutive_failures >= max_consecutive_failures:
                         logger.error(
-                            f"Camera {self.camera_id}: {consecutive_failures} consecutive frame read failures"
+                            "%s: %d consecutive frame read failures",
+                            self._log_prefix, consecutive_failures
                         )
                         self._handle_reconnection()
                         consecutive_failures = 0
@@ -135,54 +745,122 @@ class CameraStream:
                 
                 # Successful frame read
                 consecutive_failures = 0
-                self.frame_count += 1
-                self.last_frame_time = time.time()
-                
-                # Add frame to buffer (non-blocking)
-                try:
-                    self.frame_buffer.put(frame, block=False)
-                except queue.Full:
-                    # Buffer full - drop oldest frame and add new one
-                    self.dropped_frames += 1
-                    try:
-                        self.frame_buffer.get(block=False)
-                        self.frame_buffer.put(frame, block=False)
-                    except Exception as e:
-                        logger.debug(f"Camera {self.camera_id}: Buffer management error: {e}")
+                publish_frame(frame)
                         
             except Exception as e:
-                logger.error(f"Camera {self.camera_id} capture error: {e}")
+                logger.error("%s capture error: %s", self._log_prefix, e)
                 self.error_count += 1
                 time.sleep(0.5)
     
+    async def run_async(self, decoder_pool: Optional[ThreadPoolExecutor] = None):
+        """
+        Capture an HTTP MJPEG stream as an asyncio task instead of a thread
+        
+        The stream is read with aiohttp on the running event loop and JPEGs
+        are decoded in decoder_pool, so one loop thread serves many cameras
+        (see run_streams_async). Frames are published exactly like the
+        threaded capture: read(), get_latest_frame(), subscribers and the
+        shared memory ring. Runs until stop() or the reconnect attempts are
+        used up.
+        
+        Args:
+            decoder_pool: Executor for JPEG decoding (None = loop default)
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError("run_async requires aiohttp (pip install aiohttp)")
+        if not self.stream_url.startswith(("http://", "https://")):
+            raise ValueError(f"run_async only handles HTTP MJPEG streams, got {self.stream_url}")
+        
+        loop = asyncio.get_running_loop()
+        self.is_running = True
+        self.start_time = time.time()
+        self._last_ns = time.monotonic_ns()
+        logger.info("Starting %s (async) from %s", self._log_prefix, self.stream_url)
+        
+        failures = 0
+        timeout = aiohttp.ClientTimeout(sock_connect=self.timeout, sock_read=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            while self.is_running:
+                try:
+                    async with session.get(self.stream_url) as response:
+                        response.raise_for_status()
+                        buffer = bytearray()
+                        self._decode_flag = None  # Source size may change on reconnect
+                        
+                        async for chunk in response.content.iter_chunked(MJPEGReader.CHUNK_SIZE):
+                            if not self.is_running:
+                                break
+                            buffer += chunk
+                            
+                            # Decode only the newest complete JPEG in the buffer
+                            jpeg = pop_jpeg(buffer)
+                            while jpeg is not None:
+                                newer = pop_jpeg(buffer)
+                                if newer is None:
+                                    break
+                                self.dropped_frames += 1
+                                jpeg = newer
+                            if jpeg is None:
+                                continue
+                            
+                            frame = await loop.run_in_executor(decoder_pool, self._decode_jpeg, jpeg)
+                            if not self.is_running:
+                                break
+                            if frame is None:
+                                self.error_count += 1
+                                continue
+                            
+                            failures = 0
+                            if self.use_shared_memory and self.frame_ring is None:
+                                self.frame_ring = SharedFrameRing(self.buffer_size, frame.shape)
+                            self._publish_frame(frame)
+                
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("%s async capture error: %s", self._log_prefix, e)
+                    self.error_count += 1
+                
+                if not self.is_running:
+                    break
+                
+                failures += 1
+                if failures > self.reconnect_attempts:
+                    logger.error("✗ %s reconnection failed - stopping stream", self._log_prefix)
+                    break
+                logger.warning(
+                    "%s disconnected, reconnection attempt %d/%d",
+                    self._log_prefix, failures, self.reconnect_attempts
+                )
+                await asyncio.sleep(2)
+        
+        self.is_running = False
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+    
     def _handle_reconnection(self):
         """Handle camera disconnection and attempt reconnection"""
-        logger.warning(f"Camera {self.camera_id} disconnected, attempting reconnection...")
+        logger.warning("%s disconnected, attempting reconnection...", self._log_prefix)
         
         # Release current capture
         if self.capture:
             try:
                 self.capture.release()
-            except:
+            except Exception:
                 pass
         
         # Attempt reconnection
         for attempt in range(self.reconnect_attempts):
             time.sleep(2)
             
-            try:
-                self.capture = cv2.VideoCapture(self.stream_url)
-                self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                
-                if self.capture.isOpened():
-                    ret, test_frame = self.capture.read()
-                    if ret and test_frame is not None:
-                        logger.info(f"✓ Camera {self.camera_id} reconnected successfully")
-                        return
-            except Exception as e:
-                logger.error(f"Camera {self.camera_id} reconnection error: {e}")
+            test_frame = self._connect()
+            if test_frame is None and self._fall_back_to_ffmpeg():
+                test_frame = self._connect()
+            if test_frame is not None:
+                logger.info("✓ %s reconnected successfully", self._log_prefix)
+                return
         
-        logger.error(f"✗ Camera {self.camera_id} reconnection failed - stopping stream")
+        logger.error("✗ %s reconnection failed - stopping stream", self._log_prefix)
         self.is_running = False
     
     def read(self, timeout: float = 1.0) -> Optional[np.ndarray]:
@@ -197,31 +875,28 @@ class CameraStream:
         """
         if not self.is_running:
             return None
-            
-        try:
-            frame = self.frame_buffer.get(timeout=timeout)
-            return frame
-        except queue.Empty:
-            logger.debug(f"Camera {self.camera_id}: No frame available within timeout")
-            return None
+        
+        with self._frame_ready:
+            self._frame_ready.wait_for(
+                lambda: self._latest_frame is not None or not self.is_running,
+                timeout
+            )
+            frame, self._latest_frame = self._latest_frame, None
+        
+        if frame is None:
+            logger.debug("%s: No frame available within timeout", self._log_prefix)
+        return frame
     
     def get_latest_frame(self) -> Optional[np.ndarray]:
         """
-        Get most recent frame, discarding all older buffered frames
+        Get most recent frame without waiting
         
         Returns:
-            Most recent frame or None
+            Most recent unread frame or None
         """
-        latest_frame = None
-        
-        # Drain buffer to get latest
-        while not self.frame_buffer.empty():
-            try:
-                latest_frame = self.frame_buffer.get(block=False)
-            except queue.Empty:
-                break
-        
-        return latest_frame
+        with self._frame_ready:
+            frame, self._latest_frame = self._latest_frame, None
+        return frame
     
     def get_stats(self) -> Dict[str, any]:
         """
@@ -230,19 +905,23 @@ class CameraStream:
         Returns:
             Dictionary containing stream statistics
         """
-        current_time = time.time()
-        
         if self.start_time and self.frame_count > 0:
-            elapsed = current_time - self.start_time
-            fps = self.frame_count / max(elapsed, 0.001)
-            
-            # Calculate time since last frame
-            if self.last_frame_time:
-                time_since_last = current_time - self.last_frame_time
-            else:
-                time_since_last = 0
+            elapsed = time.time() - self.start_time
+            avg_fps = self.frame_count / max(elapsed, 0.001)
+        else:
+            avg_fps = 0.0
+        
+        # FPS over the recent window, so stalls show up immediately
+        timestamps = tuple(self._frame_ts)
+        if len(timestamps) >= 2 and timestamps[-1] > timestamps[0]:
+            fps = (len(timestamps) - 1) * 1e9 / (timestamps[-1] - timestamps[0])
         else:
             fps = 0.0
+        
+        # Calculate time since last frame
+        if self._last_ns is not None:
+            time_since_last = (time.monotonic_ns() - self._last_ns) / 1e9
+        else:
             time_since_last = 0
         
         return {
@@ -250,9 +929,12 @@ class CameraStream:
             "is_running": self.is_running,
             "frame_count": self.frame_count,
             "dropped_frames": self.dropped_frames,
+            "subscriber_dropped_frames": self.subscriber_dropped_frames,
+            "ring_dropped_frames": self.ring_dropped_frames,
             "error_count": self.error_count,
             "fps": round(fps, 2),
-            "buffer_size": self.frame_buffer.qsize(),
+            "avg_fps": round(avg_fps, 2),
+            "buffer_size": int(self._latest_frame is not None),
             "time_since_last_frame": round(time_since_last, 2),
             "drop_rate_percent": round(
                 (self.dropped_frames / max(self.frame_count, 1)) * 100, 2
@@ -272,10 +954,10 @@ class CameraStream:
         if not self.is_running:
             return False
         
-        if self.last_frame_time is None:
+        if self._last_ns is None:
             return False
         
-        time_since_last = time.time() - self.last_frame_time
+        time_since_last = (time.monotonic_ns() - self._last_ns) / 1e9
         return time_since_last < max_time_since_frame
     
     def stop(self):
@@ -283,9 +965,17 @@ class CameraStream:
         if not self.is_running:
             return
             
-        logger.info(f"Stopping camera {self.camera_id}...")
+        logger.info("Stopping %s...", self._log_prefix)
         self.is_running = False
         
+        with _STREAMS_LOCK:
+            if _STREAMS.get(self.stream_url) is self:
+                del _STREAMS[self.stream_url]
+        
+        # Wake readers waiting for a frame
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+        
         # Wait for thread to finish
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=5)
@@ -294,17 +984,33 @@ class CameraStream:
         if self.capture:
             try:
                 self.capture.release()
-            except:
+            except Exception:
                 pass
         
         # Clear buffer
-        while not self.frame_buffer.empty():
-            try:
-                self.frame_buffer.get(block=False)
-            except:
-                break
+        with self._frame_ready:
+            self._latest_frame = None
+        
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+            self.frame_ring = None
         
-        logger.info(f"✓ Camera {self.camera_id} stopped (Total frames: {self.frame_count})")
+        logger.info("✓ %s stopped (Total frames: %d)", self._log_prefix, self.frame_count)
+
+
+async def run_streams_async(streams: List[CameraStream]):
+    """
+    Run several MJPEG cameras on the current event loop
+    
+    All streams share one decoder pool of min(CPUs, cameras) threads instead
+    of one blocking capture thread per camera.
+    
+    Args:
+        streams: Camera streams with HTTP MJPEG URLs
+    """
+    workers = max(1, min(os.cpu_count() or 1, len(streams)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jpeg-decode") as pool:
+        await asyncio.gather(*(stream.run_async(pool) for stream in streams))
 
 
 # Test function
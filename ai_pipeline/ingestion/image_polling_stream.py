@@ -4,15 +4,42 @@ Continuously polls /shot.jpg to simulate video stream
 """
 
 import cv2
+import inspect
 import numpy as np
 import time
 import logging
 import requests
-from typing import Optional, Dict
-from threading import Thread, Lock
-import queue
+from typing import Optional, Dict, List
+from threading import Thread, Lock, Condition
 from io import BytesIO
 
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # HTTP/2 support for httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJFLAG_FASTDCT, TJFLAG_FASTUPSAMPLE
+    TURBOJPEG_AVAILABLE = True
+    # Decoding into a caller-provided array needs PyTurboJPEG >= 1.7
+    TURBOJPEG_DST = "dst" in inspect.signature(TurboJPEG.decode).parameters
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+try:
+    import torch
+    from torchvision.io import decode_jpeg
+    NVJPEG_AVAILABLE = torch.cuda.is_available()
+except ImportError:
+    NVJPEG_AVAILABLE = False
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -29,7 +56,9 @@ class ImagePollingStream:
         snapshot_url: str,
         poll_interval: float = 0.033,  # ~30 FPS
         buffer_size: int = 10,
-        timeout: int = 5
+        timeout: int = 5,
+        fast_decode: bool = True,
+        gpu_decode: bool = False
     ):
         """
         Initialize image polling stream
@@ -38,16 +67,27 @@ class ImagePollingStream:
             camera_id: Unique camera identifier
             snapshot_url: URL to snapshot image (e.g., http://IP:8080/shot.jpg)
             poll_interval: Time between image polls in seconds (default: 0.033 = 30fps)
-            buffer_size: Maximum frames to buffer
+            buffer_size: Unused; only the latest frame is held (older unread
+                frames are dropped)
             timeout: HTTP request timeout in seconds
+            fast_decode: Use TurboJPEG's fast (slightly less accurate) IDCT
+                and chroma upsampling; fine for preview frames
+            gpu_decode: Skip CPU decoding and buffer each snapshot as a uint8
+                tensor of JPEG bytes, for consumers that decode on the GPU
+                with nvJPEG (LowLightEnhancer.enhance_from_jpeg). Needs CUDA
         """
         self.camera_id = camera_id
         self.snapshot_url = snapshot_url
         self.poll_interval = poll_interval
         self.buffer_size = buffer_size
         self.timeout = timeout
+        self.gpu_decode = gpu_decode and NVJPEG_AVAILABLE
+        if gpu_decode and not self.gpu_decode:
+            logger.warning(f"Camera {camera_id}: nvJPEG unavailable, decoding snapshots on CPU")
         
-        self.frame_buffer = queue.Queue(maxsize=buffer_size)
+        # Single-slot latest frame; consumers only ever want the newest one
+        self._latest_frame = None
+        self._frame_ready = Condition()
         self.is_running = False
         self.thread = None
         self.lock = Lock()
@@ -59,9 +99,60 @@ class ImagePollingStream:
         self.start_time = None
         self.last_frame_time = None
         
-        # HTTP session for connection pooling
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'RailwayWagonMonitor/1.0'})
+        # HTTP client for connection pooling. httpx keeps connections alive
+        # and speaks HTTP/2 (one multiplexed connection, no re-handshakes)
+        # when the camera supports it; requests is the fallback.
+        headers = {'User-Agent': 'RailwayWagonMonitor/1.0'}
+        if HTTPX_AVAILABLE:
+            self.session = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                headers=headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=4, max_connections=8)
+            )
+        else:
+            self.session = requests.Session()
+            self.session.headers.update(headers)
+        
+        # libjpeg-turbo decodes straight to BGR with SIMD Huffman/IDCT;
+        # cv2.imdecode is the fallback without it
+        self.turbojpeg = None
+        self.decode_flags = TJFLAG_FASTDCT | TJFLAG_FASTUPSAMPLE if TURBOJPEG_AVAILABLE and fast_decode else 0
+        if TURBOJPEG_AVAILABLE:
+            try:
+                self.turbojpeg = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"libturbojpeg not found, decoding with OpenCV: {e}")
+        
+        # Frames that were replaced before any consumer read them; the
+        # polling thread decodes into these instead of allocating new arrays
+        self._free_buffers: List[np.ndarray] = []
+    
+    def _decode(self, data: bytes) -> Optional[np.ndarray]:
+        """Decode a JPEG snapshot to a BGR frame (None if it is not decodable)"""
+        if self.turbojpeg is not None:
+            try:
+                if not TURBOJPEG_DST:
+                    return self.turbojpeg.decode(data, pixel_format=TJPF_BGR, flags=self.decode_flags)
+                
+                width, height = self.turbojpeg.decode_header(data)[:2]
+                buffer = self._take_buffer((height, width, 3))
+                return self.turbojpeg.decode(
+                    data, pixel_format=TJPF_BGR, flags=self.decode_flags, dst=buffer
+                )
+            except (OSError, ValueError):
+                return None
+        
+        img_array = np.frombuffer(data, dtype=np.uint8)
+        return cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+    
+    def _take_buffer(self, shape) -> np.ndarray:
+        """A free frame buffer of this shape, or a new one"""
+        while self._free_buffers:
+            buffer = self._free_buffers.pop()
+            if buffer.shape == shape:
+                return buffer
+        return np.empty(shape, dtype=np.uint8)
         
     def start(self) -> bool:
         """Start image polling thread"""
@@ -76,8 +167,7 @@ class ImagePollingStream:
             response = self.session.get(self.snapshot_url, timeout=self.timeout)
             if response.status_code == 200:
                 # Try to decode image
-                img_array = np.frombuffer(response.content, dtype=np.uint8)
-                test_frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+                test_frame = self._decode(response.content)
                 
                 if test_frame is not None:
                     self.is_running = True
@@ -121,9 +211,11 @@ class ImagePollingStream:
                 )
                 
                 if response.status_code == 200:
-                    # Decode image
-                    img_array = np.frombuffer(response.content, dtype=np.uint8)
-                    frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+                    # Decode image (or hand the encoded bytes to a GPU decoder)
+                    if self.gpu_decode:
+                        frame = torch.frombuffer(bytearray(response.content), dtype=torch.uint8)
+                    else:
+                        frame = self._decode(response.content)
                     
                     if frame is not None:
                         # Successful frame
@@ -131,16 +223,19 @@ class ImagePollingStream:
                         self.frame_count += 1
                         self.last_frame_time = time.time()
                         
-                        # Add to buffer
-                        try:
-                            self.frame_buffer.put(frame, block=False)
-                        except queue.Full:
+                        # Publish frame, replacing an unread older one
+                        with self._frame_ready:
+                            dropped = self._latest_frame
+                            self._latest_frame = frame
+                            self._frame_ready.notify()
+                        
+                        # Nobody ever saw the replaced frame, so its buffer
+                        # can be decoded into again (frames handed out are
+                        # owned by the consumer and never reused)
+                        if dropped is not None:
                             self.dropped_frames += 1
-                            try:
-                                self.frame_buffer.get(block=False)
-                                self.frame_buffer.put(frame, block=False)
-                            except:
-                                pass
+                            if isinstance(dropped, np.ndarray) and len(self._free_buffers) < 2:
+                                self._free_buffers.append(dropped)
                     else:
                         consecutive_failures += 1
                         self.error_count += 1
@@ -172,25 +267,23 @@ class ImagePollingStream:
                 time.sleep(sleep_time)
     
     def read(self, timeout: float = 1.0) -> Optional[np.ndarray]:
-        """Read latest frame from buffer"""
+        """Read latest frame from buffer (JPEG byte tensor with gpu_decode)"""
         if not self.is_running:
             return None
         
-        try:
-            frame = self.frame_buffer.get(timeout=timeout)
-            return frame
-        except queue.Empty:
-            return None
+        with self._frame_ready:
+            self._frame_ready.wait_for(
+                lambda: self._latest_frame is not None or not self.is_running,
+                timeout
+            )
+            frame, self._latest_frame = self._latest_frame, None
+        return frame
     
     def get_latest_frame(self) -> Optional[np.ndarray]:
-        """Get most recent frame, discarding older ones"""
-        latest_frame = None
-        while not self.frame_buffer.empty():
-            try:
-                latest_frame = self.frame_buffer.get(block=False)
-            except queue.Empty:
-                break
-        return latest_frame
+        """Get most recent unread frame without waiting"""
+        with self._frame_ready:
+            frame, self._latest_frame = self._latest_frame, None
+        return frame
     
     def get_stats(self) -> Dict[str, any]:
         """Get stream statistics"""
@@ -215,7 +308,7 @@ class ImagePollingStream:
             "dropped_frames": self.dropped_frames,
             "error_count": self.error_count,
             "fps": round(fps, 2),
-            "buffer_size": self.frame_buffer.qsize(),
+            "buffer_size": int(self._latest_frame is not None),
             "time_since_last_frame": round(time_since_last, 2),
             "drop_rate_percent": round(
                 (self.dropped_frames / max(self.frame_count, 1)) * 100, 2
@@ -241,6 +334,10 @@ class ImagePollingStream:
         logger.info(f"Stopping camera {self.camera_id}...")
         self.is_running = False
         
+        # Wake readers waiting for a frame
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+        
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=5)
         
@@ -248,11 +345,8 @@ class ImagePollingStream:
         self.session.close()
         
         # Clear buffer
-        while not self.frame_buffer.empty():
-            try:
-                self.frame_buffer.get(block=False)
-            except:
-                break
+        with self._frame_ready:
+            self._latest_frame = None
         
         logger.info(
             f"✓ Camera {self.camera_id} stopped "
@@ -7,10 +7,16 @@ import yaml
 import logging
 import time
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from .camera_stream import CameraStream
 
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,10 @@ class MultiCameraManager:
         """
         self.config_path = config_path
         self.cameras: Dict[str, CameraStream] = {}
+        # Host staging buffer for batched uploads (pinned for CUDA) and the
+        # event marking the end of its last upload
+        self._staging = None
+        self._staging_event = None
         self.load_config()
         
     def load_config(self):
@@ -79,6 +89,75 @@ class MultiCameraManager:
             frames[cam_id] = frame
         return frames
     
+    def read_all_frames_batched(
+        self,
+        device: str = "cuda"
+    ) -> Tuple[List[str], Optional["torch.Tensor"], List[Tuple[int, int]]]:
+        """
+        Read the latest frame from each camera as one device batch
+        
+        Frames are copied into one host staging buffer (pinned for CUDA,
+        zero padded to the largest height/width) and uploaded with a single
+        copy, so downstream models can run all cameras in one forward pass
+        (e.g. LowLightEnhancer.enhance_batch). Cameras without a new frame
+        are left out. Expects BGR numpy frames (CPU decoding).
+        
+        Args:
+            device: Device for the batch
+            
+        Returns:
+            (camera ids, NxHxWx3 BGR uint8 batch or None, valid (h, w) per frame)
+        """
+        if not TORCH_AVAILABLE:
+            raise RuntimeError("read_all_frames_batched requires torch")
+        
+        frames = self.read_all_frames()
+        camera_ids = [cam_id for cam_id, frame in frames.items() if frame is not None]
+        if not camera_ids:
+            return [], None, []
+        
+        sizes = [frames[cam_id].shape[:2] for cam_id in camera_ids]
+        max_h = max(h for h, _ in sizes)
+        max_w = max(w for _, w in sizes)
+        shape = (len(camera_ids), max_h, max_w, 3)
+        device = torch.device(device)
+        pinned = device.type == "cuda"
+        
+        # The previous upload may still be reading the staging buffer
+        if self._staging_event is not None:
+            self._staging_event.synchronize()
+        if self._staging is None or tuple(self._staging.shape) != shape or self._staging.is_pinned() != pinned:
+            self._staging = torch.zeros(shape, dtype=torch.uint8, pin_memory=pinned)
+        
+        staging = self._staging.numpy()
+        for k, cam_id in enumerate(camera_ids):
+            h, w = sizes[k]
+            staging[k, :h, :w] = frames[cam_id]
+            if h < max_h or w < max_w:
+                staging[k, h:] = 0
+                staging[k, :h, w:] = 0
+        
+        batch = self._staging.to(device, non_blocking=pinned)
+        if pinned:
+            self._staging_event = torch.cuda.Event()
+            self._staging_event.record()
+        return camera_ids, batch, sizes
+    
+    def get_enhanced_frames(self, enhancer) -> Dict[str, np.ndarray]:
+        """
+        Read all cameras and run low-light enhancement on them in one batch
+        
+        Args:
+            enhancer: LowLightEnhancer
+            
+        Returns:
+            Dictionary mapping camera_id to (enhanced) BGR frame
+        """
+        camera_ids, batch, sizes = self.read_all_frames_batched(str(enhancer.device))
+        if batch is None:
+            return {}
+        return dict(zip(camera_ids, enhancer.enhance_batch(batch, sizes)))
+    
     def get_synchronized_frames(
         self,
         timeout: float = 2.0,
@@ -94,20 +173,19 @@ class MultiCameraManager:
         Returns:
             Dictionary of synchronized frames or None if timeout
         """
-        start_time = time.time()
+        # Block on each camera's frame condition against one shared deadline
+        # (no polling); frames already received are kept while waiting
+        deadline = time.monotonic() + timeout
         frames = {}
         
-        while time.time() - start_time < timeout:
-            frames = self.read_all_frames()
-            
-            # Check if all frames are available
-            if all(frame is not None for frame in frames.values()):
-                return frames
-            
-            time.sleep(0.01)  # Small delay before retry
+        for cam_id, camera in self.cameras.items():
+            frame = camera.read(timeout=max(0.0, deadline - time.monotonic()))
+            if frame is None:
+                logger.warning("Timeout waiting for synchronized frames (camera %s)", cam_id)
+                return None
+            frames[cam_id] = frame
         
-        logger.warning("Timeout waiting for synchronized frames")
-        return None
+        return frames
     
     def get_all_stats(self) -> Dict[str, dict]:
         """Get statistics for all cameras"""
@@ -5,12 +5,24 @@ Low-light enhancement inference using Zero-DCE
 import cv2
 import numpy as np
 import torch
-from typing import Optional
+from typing import List, Optional, Tuple, Union
 from pathlib import Path
 import yaml
 
 from ai_pipeline.low_light_enhancement.model import create_zero_dce
 
+try:
+    from torchvision.io import decode_jpeg, ImageReadMode
+    JPEG_DECODE_AVAILABLE = True
+except ImportError:
+    JPEG_DECODE_AVAILABLE = False
+
+try:
+    import torch_tensorrt  # Registers the "torch_tensorrt" torch.compile backend
+    TORCH_TRT_AVAILABLE = True
+except ImportError:
+    TORCH_TRT_AVAILABLE = False
+
 
 class LowLightEnhancer:
     """Zero-DCE based low-light enhancement"""
@@ -19,9 +31,23 @@ class LowLightEnhancer:
         self,
         config_path: str = "ai_pipeline/configs/low_light.yaml",
         model_path: Optional[str] = None,
-        device: str = "cpu"
+        device: str = "cpu",
+        gpu_decode: bool = True,
+        compile_model: bool = True
     ):
+        """
+        Initialize low-light enhancer
+        
+        Args:
+            config_path: Path to configuration file
+            model_path: Path to trained model checkpoint
+            device: Device to run on ("cpu" or "cuda")
+            gpu_decode: Decode enhance_from_jpeg input with nvJPEG (CUDA only)
+            compile_model: Compile Zero-DCE with torch.compile (CUDA only)
+        """
         self.device = torch.device(device)
+        # enhance_from_jpeg decodes with nvJPEG straight into device memory
+        self.gpu_decode = gpu_decode and JPEG_DECODE_AVAILABLE and self.device.type == "cuda"
         
         # Load config
         with open(config_path, 'r') as f:
@@ -47,8 +73,63 @@ class LowLightEnhancer:
         else:
             print("ℹ Using untrained model (for testing)")
         
+        # Page-locked staging buffer for frame uploads (CUDA only), sized on
+        # the first frame and reused while the camera resolution holds
+        self._pinned_input: Optional[torch.Tensor] = None
+        
         self.auto_detect = self.config.get('inference', {}).get('auto_detect_low_light', True)
         self.brightness_threshold = self.config.get('inference', {}).get('brightness_threshold', 50)
+        
+        # The graph is static per camera resolution: compile with static
+        # shapes (one specialization per resolution, cached by torch.compile)
+        # so the conv stack and the curve iterations run as fused kernels
+        self.compiled = False
+        # Grow-only (N, H, W) that enhance_batch pads to for the compiled model
+        self._batch_shape = (0, 0, 0)
+        if compile_model and self.device.type == "cuda" and hasattr(torch, "compile"):
+            self._compile_model()
+            self.warmup(self.config.get('inference', {}).get('warmup_shapes') or [])
+    
+    def _compile_model(self):
+        """Compile Zero-DCE (Inductor, or TensorRT via inference.compile_backend)"""
+        eager_model = self.model
+        backend = self.config.get('inference', {}).get('compile_backend', 'inductor')
+        
+        if backend == "tensorrt" and TORCH_TRT_AVAILABLE:
+            self.model = torch.compile(
+                eager_model, backend="torch_tensorrt", dynamic=False,
+                options={"enabled_precisions": {torch.float16}}
+            )
+        else:
+            if backend == "tensorrt":
+                print("ℹ torch_tensorrt not installed, compiling with Inductor")
+            backend = "inductor"
+            self.model = torch.compile(eager_model, mode="reduce-overhead", fullgraph=True, dynamic=False)
+        
+        dummy = torch.zeros(1, 3, 64, 64, device=self.device)
+        try:
+            self._forward(dummy)
+            self.compiled = True
+            print(f"✓ Compiled low-light model (torch.compile, backend={backend})")
+        except Exception as e:
+            self.model = eager_model
+            print(f"⚠ torch.compile failed, using eager model: {e}")
+    
+    def warmup(self, shapes: List[Tuple[int, int]]):
+        """
+        Run two dummy forwards per frame size, so compilation (and CUDA graph
+        capture) for each camera resolution happens here
+        
+        Args:
+            shapes: Frame sizes as (height, width)
+        """
+        for h, w in shapes:
+            dummy = torch.zeros(1, 3, h, w, device=self.device)
+            for _ in range(2):
+                self._forward(dummy)
+        
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
     
     def is_low_light(self, image: np.ndarray) -> bool:
         """
@@ -60,26 +141,126 @@ class LowLightEnhancer:
         Returns:
             True if low-light detected
         """
-        # Convert to grayscale and compute mean brightness
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        mean_brightness = np.mean(gray)
+        # Mean BT.601 luma over every 16th pixel; a brightness gate needs no
+        # full-size grayscale image
+        mean_b, mean_g, mean_r = image[::16, ::16].mean(axis=(0, 1))
+        mean_brightness = 0.114 * mean_b + 0.587 * mean_g + 0.299 * mean_r
         
         return mean_brightness < self.brightness_threshold
     
+    def _is_low_light_tensor(self, tensor: torch.Tensor) -> bool:
+        """is_low_light for a (1, 3, H, W) RGB tensor in [0, 1], on its device"""
+        return self._mean_luma(tensor).item() * 255.0 < self.brightness_threshold
+    
+    @staticmethod
+    def _mean_luma(tensor: torch.Tensor) -> torch.Tensor:
+        """Strided BT.601 mean luma of an RGB tensor in [0, 1] (0-dim, on device)"""
+        mean_rgb = tensor[..., ::16, ::16].mean(dim=(0, 2, 3))
+        weights = tensor.new_tensor([0.299, 0.587, 0.114])
+        return (mean_rgb * weights).sum()
+    
     def preprocess(self, image: np.ndarray) -> torch.Tensor:
-        """Preprocess image"""
-        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        tensor = torch.from_numpy(rgb).float() / 255.0
-        tensor = tensor.permute(2, 0, 1).unsqueeze(0)
-        return tensor.to(self.device)
+        """
+        Preprocess image
+        
+        Only the uint8 BGR frame crosses to the device; the channel swap and
+        normalization run there. On CUDA the upload is asynchronous from a
+        pinned buffer, which postprocess()'s download synchronizes with.
+        """
+        tensor = torch.from_numpy(np.ascontiguousarray(image))
+        
+        if self.device.type == "cuda":
+            if self._pinned_input is None or self._pinned_input.shape != tensor.shape:
+                self._pinned_input = torch.empty(tensor.shape, dtype=torch.uint8).pin_memory()
+            self._pinned_input.copy_(tensor)
+            tensor = self._pinned_input.to(self.device, non_blocking=True)
+        else:
+            tensor = tensor.to(self.device)
+        
+        # HWC BGR uint8 -> 1x3xHxW RGB float in [0, 1]
+        return tensor.permute(2, 0, 1).unsqueeze(0).flip(1).float().mul_(1.0 / 255.0)
+    
+    def _forward(self, input_tensor: torch.Tensor) -> torch.Tensor:
+        """Run Zero-DCE, in FP16 autocast on CUDA; returns a float32 tensor"""
+        with torch.inference_mode(), torch.autocast(
+            device_type="cuda", dtype=torch.float16,
+            enabled=self.device.type == "cuda"
+        ):
+            output_tensor = self.model(input_tensor)
+        return output_tensor.float()
+    
+    @staticmethod
+    def _to_bgr_uint8(tensor: torch.Tensor) -> torch.Tensor:
+        """Nx3xHxW RGB in [0, 1] -> contiguous NxHxWx3 BGR uint8, on the same device"""
+        output = tensor.mul(255.0).clamp_(0, 255).to(torch.uint8)
+        return output.permute(0, 2, 3, 1).flip(-1).contiguous()
     
     def postprocess(self, tensor: torch.Tensor) -> np.ndarray:
-        """Postprocess tensor to image"""
-        output = tensor.squeeze(0).cpu()
-        output = torch.clamp(output, 0, 1) * 255.0
-        image = output.permute(1, 2, 0).numpy().astype(np.uint8)
-        bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        return bgr
+        """Postprocess tensor to image (one uint8 download)"""
+        return self._to_bgr_uint8(tensor)[0].cpu().numpy()
+    
+    def enhance_batch(
+        self,
+        batch: torch.Tensor,
+        sizes: List[Tuple[int, int]],
+        force: bool = False
+    ) -> List[np.ndarray]:
+        """
+        Enhance frames from several cameras with one forward pass
+        
+        Frames smaller than the batch are zero padded at the bottom/right
+        (see MultiCameraManager.read_all_frames_batched); the convolutions
+        only see a few padded pixels at those edges. The low-light check
+        runs per frame on its own region, and only low-light frames are
+        enhanced. A compiled model always sees the whole batch at a fixed
+        padded shape, so it is not recompiled as cameras come and go.
+        
+        Args:
+            batch: NxHxWx3 BGR uint8 tensor (any device)
+            sizes: Valid (height, width) of each frame
+            force: Force enhancement even if not detected as low-light
+            
+        Returns:
+            Enhanced (or unchanged) BGR image per frame, cropped to its size
+        """
+        # NHWC BGR uint8 -> NCHW RGB float in [0, 1], on the device
+        images = batch.to(self.device, non_blocking=True)
+        images = images.permute(0, 3, 1, 2).flip(1).float().mul_(1.0 / 255.0)
+        
+        if self.auto_detect and not force:
+            # One host sync for all frames
+            lumas = torch.stack([
+                self._mean_luma(images[k:k + 1, :, :h, :w]) for k, (h, w) in enumerate(sizes)
+            ]).mul_(255.0).tolist()
+            low_light = [k for k, luma in enumerate(lumas) if luma < self.brightness_threshold]
+        else:
+            low_light = list(range(len(sizes)))
+        
+        if low_light and self.compiled:
+            # The static-shape graph would recompile (and recapture) for every
+            # new batch size or padded size; forward the whole batch padded
+            # to the largest shape seen so far, then keep the low-light rows
+            n, _, h, w = images.shape
+            self._batch_shape = tuple(map(max, self._batch_shape, (n, h, w)))
+            padded_n, padded_h, padded_w = self._batch_shape
+            padded = images.new_zeros((padded_n, 3, padded_h, padded_w))
+            padded[:n, :, :h, :w] = images
+            enhanced = self._forward(padded)[:n, :, :h, :w]
+            
+            if len(low_light) == len(sizes):
+                images = enhanced
+            else:
+                index = torch.tensor(low_light, device=images.device)
+                images[index] = enhanced[index]
+        elif len(low_light) == len(sizes):
+            images = self._forward(images)
+        elif low_light:
+            index = torch.tensor(low_light, device=images.device)
+            images[index] = self._forward(images[index])
+        
+        # One download for the whole batch, then split per camera
+        frames = self._to_bgr_uint8(images).cpu().numpy()
+        return [frames[k, :h, :w] for k, (h, w) in enumerate(sizes)]
     
     def enhance(self, image: np.ndarray, force: bool = False) -> np.ndarray:
         """
@@ -99,12 +280,55 @@ class LowLightEnhancer:
         
         # Enhance
         input_tensor = self.preprocess(image)
-        
-        with torch.no_grad():
-            enhanced_tensor = self.model(input_tensor)
+        enhanced_tensor = self._forward(input_tensor)
         
         enhanced = self.postprocess(enhanced_tensor)
         return enhanced
+    
+    def enhance_from_jpeg(
+        self,
+        jpeg: Union[bytes, torch.Tensor],
+        force: bool = False,
+        download: bool = True
+    ) -> Union[np.ndarray, torch.Tensor]:
+        """
+        Enhance an encoded JPEG frame (e.g. from a gpu_decode polling stream)
+        
+        With gpu_decode the JPEG is decoded by nvJPEG into device memory and
+        fed to the model directly, skipping imdecode, cvtColor and the
+        host-to-device copy of the decoded frame.
+        
+        Args:
+            jpeg: JPEG bytes, or a uint8 CPU tensor of them
+            force: Force enhancement even if not detected as low-light
+            download: Return a BGR numpy image; otherwise the (1, 3, H, W)
+                RGB tensor in [0, 1] stays on the device (a copy, since a
+                compiled model reuses its output buffer on the next call)
+            
+        Returns:
+            Enhanced image (or the decoded frame if it is not low-light)
+        """
+        if not JPEG_DECODE_AVAILABLE:
+            image = cv2.imdecode(np.frombuffer(bytes(jpeg), dtype=np.uint8), cv2.IMREAD_COLOR)
+            enhanced = self.enhance(image, force=force)
+            return enhanced if download else self.preprocess(enhanced)
+        
+        data = jpeg if isinstance(jpeg, torch.Tensor) else torch.frombuffer(bytearray(jpeg), dtype=torch.uint8)
+        if self.gpu_decode:
+            rgb = decode_jpeg(data, mode=ImageReadMode.RGB, device=self.device)
+        else:
+            rgb = decode_jpeg(data, mode=ImageReadMode.RGB).to(self.device)
+        input_tensor = rgb.float().div_(255.0).unsqueeze(0)
+        
+        # Check if enhancement needed
+        if self.auto_detect and not force and not self._is_low_light_tensor(input_tensor):
+            enhanced_tensor = input_tensor
+        else:
+            enhanced_tensor = self._forward(input_tensor)
+        
+        if download:
+            return self.postprocess(enhanced_tensor)
+        return enhanced_tensor.clone() if self.compiled else enhanced_tensor
 
 
 # Test
@@ -33,9 +33,10 @@ class BlurDetector:
         laplacian_var = laplacian.var()
         
         # Metric 2: Gradient magnitude (Tenengrad)
-        gx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        gy = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        gradient_mag = np.sqrt(gx**2 + gy**2).mean()
+        # FP32 + cv2.magnitude: one SIMD pass, no squared/sum temporaries
+        gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+        gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+        gradient_mag = cv2.mean(cv2.magnitude(gx, gy))[0]
         
         # Metric 3: Edge strength
         edges = cv2.Canny(gray, 100, 200)
@@ -2,6 +2,8 @@ import numpy as np
 from typing import List, Dict
 import time
 
+from ai_pipeline.utils.box_matching import iou_matrix, match_boxes
+
 class WagonTracker:
     def __init__(self, iou_threshold: float = 0.3):
         """
@@ -51,28 +53,30 @@ class WagonTracker:
         tracked = []
         current_time = time.time()
         
-        for wagon in wagons:
+        # IoU of every detection against this camera's tracks in one broadcast
+        track_ids = [
+            wagon_id for wagon_id, tracked_wagon in self.tracked_wagons.items()
+            if tracked_wagon['camera_id'] == camera_id
+        ]
+        det_boxes = np.array([wagon['bbox'] for wagon in wagons], dtype=np.float64).reshape(-1, 4)
+        track_boxes = np.array(
+            [self.tracked_wagons[wagon_id]['bbox'] for wagon_id in track_ids], dtype=np.float64
+        ).reshape(-1, 4)
+        
+        # Boxes are (x, y, w, h); the shared helper takes corners
+        det_boxes[:, 2:] += det_boxes[:, :2]
+        track_boxes[:, 2:] += track_boxes[:, :2]
+        matches = [None] * len(wagons)
+        rows, cols = match_boxes(iou_matrix(det_boxes, track_boxes), self.iou_threshold)
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            matches[r] = c
+        
+        for wagon, match in zip(wagons, matches):
             bbox = wagon['bbox']
             
-            # Try to match with existing tracked wagons
-            matched = False
-            best_match_id = None
-            best_iou = 0
-            
-            for wagon_id, tracked_wagon in self.tracked_wagons.items():
-                if tracked_wagon['camera_id'] != camera_id:
-                    continue
-                
-                iou = self.calculate_iou(bbox, tracked_wagon['bbox'])
-                
-                if iou > self.iou_threshold and iou > best_iou:
-                    best_iou = iou
-                    best_match_id = wagon_id
-                    matched = True
-            
-            if matched and best_match_id:
+            if match is not None:
                 # Update existing wagon
-                wagon_id = best_match_id
+                wagon_id = track_ids[match]
                 self.tracked_wagons[wagon_id]['bbox'] = bbox
                 self.tracked_wagons[wagon_id]['last_seen'] = current_time
             else:
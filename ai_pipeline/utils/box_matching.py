@@ -0,0 +1,83 @@
+"""
+Box matching helpers shared by the wagon trackers
+Vectorized IoU and one-to-one detection/track assignment
+"""
+
+import numpy as np
+from typing import Tuple
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+
+def iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU between two sets of (x1, y1, x2, y2) boxes
+
+    Args:
+        boxes1: Array of shape (N, 4)
+        boxes2: Array of shape (M, 4)
+
+    Returns:
+        IoU matrix of shape (N, M), 0 where the union is empty
+    """
+    b1 = boxes1[:, np.newaxis, :]
+    b2 = boxes2[np.newaxis, :, :]
+
+    # Intersection
+    inter_w = np.clip(np.minimum(b1[..., 2], b2[..., 2]) - np.maximum(b1[..., 0], b2[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(b1[..., 3], b2[..., 3]) - np.maximum(b1[..., 1], b2[..., 1]), 0, None)
+    intersection = inter_w * inter_h
+
+    # Union
+    area1 = (b1[..., 2] - b1[..., 0]) * (b1[..., 3] - b1[..., 1])
+    area2 = (b2[..., 2] - b2[..., 0]) * (b2[..., 3] - b2[..., 1])
+    union = area1 + area2 - intersection
+
+    return np.divide(
+        intersection, union,
+        out=np.zeros_like(intersection), where=union > 0
+    )
+
+
+def match_boxes(iou: np.ndarray, iou_threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One-to-one assignment of detections to tracks maximizing total IoU
+
+    Uses Hungarian assignment when scipy is available, otherwise a greedy
+    match over pairs in descending IoU. Pairs at or below the threshold
+    are dropped.
+
+    Args:
+        iou: Detection x track IoU matrix
+        iou_threshold: Minimum IoU for a match
+
+    Returns:
+        Tuple of (detection indices, track indices) of the matched pairs
+    """
+    if iou.size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    if SCIPY_AVAILABLE:
+        rows, cols = linear_sum_assignment(iou, maximize=True)
+    else:
+        # Greedy on pairs in descending IoU, each detection/track used once
+        rows, cols = [], []
+        used_rows, used_cols = set(), set()
+        for flat in np.argsort(-iou, axis=None, kind='stable'):
+            r, c = divmod(int(flat), iou.shape[1])
+            if iou[r, c] <= iou_threshold:
+                break
+            if r not in used_rows and c not in used_cols:
+                rows.append(r)
+                cols.append(c)
+                used_rows.add(r)
+                used_cols.add(c)
+        rows, cols = np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+    keep = iou[rows, cols] > iou_threshold
+    return rows[keep], cols[keep]